@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the cold start of lambda_function: each run imports it in a fresh interpreter and
+handles the doc/test.json LaunchRequest, as the first invocation of a new Lambda container.
+
+    python benchmark/bench_cold_start.py [--runs 20] [--lambda-dir <folder>] [--output results/cold_start.json]
+
+Point --lambda-dir to the lambda_functions folder of another checkout (e.g. from
+`git worktree add`) to compare versions on the same machine.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from common import LAMBDA_DIR, summarize, write_results
+
+EVENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "doc", "test.json")
+
+# Runs inside the fresh interpreter, prints its timings as JSON
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import lambda_function
+import_time = time.perf_counter() - start
+
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 8000
+
+with open(sys.argv[1], encoding="utf-8") as f:
+    event = json.load(f)
+start = time.perf_counter()
+lambda_function.lambda_handler(event, Context())
+first_request = time.perf_counter() - start
+print(json.dumps({
+    "import": import_time,
+    "first_request": first_request,
+    "profile": getattr(lambda_function, "startup_timings", {}),
+    "modules": len(sys.modules),
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--lambda-dir", default=LAMBDA_DIR)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # No Home Assistant: the launch prompt fetch fails right away, only the skill itself is measured
+    env = dict(os.environ, home_assistant_url="", PYTHONDONTWRITEBYTECODE="1")
+    samples = {"process": [], "import": [], "first_request": []}
+    profiles = []
+    modules = 0
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, os.path.abspath(EVENT_FILE)],
+            cwd=args.lambda_dir, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples["process"].append(time.perf_counter() - start)
+        result = json.loads(output.strip().splitlines()[-1])
+        samples["import"].append(result["import"])
+        samples["first_request"].append(result["first_request"])
+        profiles.append(result["profile"])
+        modules = result["modules"]
+
+    # Median of each startup profile step
+    steps = {}
+    for profile in profiles:
+        for step, ms in profile.items():
+            steps.setdefault(step, []).append(ms)
+    profile_p50 = {step: sorted(values)[len(values) // 2] for step, values in steps.items()}
+
+    write_results("cold_start", {
+        "lambda_dir": os.path.abspath(args.lambda_dir),
+        "bundle": os.path.exists(os.path.join(args.lambda_dir, "bundle.json")),
+        "modules_loaded": modules,
+        "process": summarize(samples["process"]),
+        "import": summarize(samples["import"]),
+        "first_request": summarize(samples["first_request"]),
+        "startup_profile_p50_ms": profile_p50,
+    }, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the execution core of lambda_function (persistent event loop) with the previous
+approach, a new event loop per request.
+
+    python benchmark/bench_executor.py [--iterations 500] [--output results/executor.json]
+"""
+import time
+import asyncio
+import threading
+import argparse
+
+from common import import_lambda_function, summarize, write_results
+
+# Previous run_async_in_executor: creates and closes an event loop on every request
+def legacy_run_async_in_executor(executor, func, *args):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(loop.run_in_executor(executor, func, *args))
+    finally:
+        loop.close()
+
+def noop():
+    return None
+
+def measure(run, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--ack-latency", type=float, default=0.1, help="Simulated acknowledgment directive call, in seconds")
+    parser.add_argument("--ha-latency", type=float, default=0.3, help="Simulated HA conversation call, in seconds")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lf = import_lambda_function()
+    import_time = time.perf_counter() - start
+
+    # Startup cost of the persistent loop thread
+    start = time.perf_counter()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result()
+    loop_startup = time.perf_counter() - start
+    loop.call_soon_threadsafe(loop.stop)
+
+    results = {
+        "import_ms": import_time * 1000,
+        "persistent_loop_startup_ms": loop_startup * 1000,
+        "per_request_overhead": {
+            "new_loop_per_request": measure(lambda: legacy_run_async_in_executor(lf.executor, noop), args.iterations),
+            "persistent_loop": measure(lambda: lf.run_async_in_executor(noop), args.iterations),
+        },
+    }
+
+    # Acknowledgment directive + HA call: back-to-back before, concurrent now
+    ack = lambda: time.sleep(args.ack_latency)
+    ha_call = lambda: time.sleep(args.ha_latency)
+    iterations = max(3, args.iterations // 100)
+    results["acknowledgment_and_ha_call"] = {
+        "sequential": measure(lambda: (ack(), legacy_run_async_in_executor(lf.executor, ha_call)), iterations),
+        "concurrent": measure(lambda: lf.run_async_in_executor(ha_call, on_start=ack), iterations),
+    }
+
+    write_results("executor", results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the post-processing of the spoken answers (improve_response), chained str.replace calls
+and re.sub through the re module cache, with a variant using module-level compiled patterns, for
+short and ~5 KB answers.
+
+    python benchmark/bench_improve_response.py [--iterations 2000] [--output results/improve_response.json]
+"""
+import re
+import time
+import argparse
+
+from common import import_lambda_function, summarize, write_results
+
+SHORT_ANSWER = "The living room temperature is 21.5 °C and the humidity is 48 %."
+PARAGRAPH = (
+    "Here is a summary of your home:\n\n"
+    "- Living room: the lights are on, the temperature is 21.5 °C and the TV is playing.\n"
+    "- Kitchen: the dishwasher finished 25 minutes ago, energy usage was 1.2 kWh.\n"
+    "- Garage: the door is **closed** and the car_charger is at 80 %.\n\n"
+    "Anything else? I can also turn off the lights or lock the front door (sensor.front_door).\n\n"
+)
+LONG_ANSWER = (PARAGRAPH * (5120 // len(PARAGRAPH) + 1))[:5120]
+
+# Compiled variant: "-" is part of the removed characters, "_" becomes a space after stripping
+REMOVED_CHARS_PATTERN = re.compile(r"[^A-Za-z0-9çÇáàâãäéèêíïóôõöúüñÁÀÂÃÄÉÈÊÍÏÓÔÕÖÚÜÑ\sß.,!?°_]")
+DECIMAL_POINT_PATTERN = re.compile(r"(\d+)\.(\d{1,3})(?!\d)")
+
+def compiled_improve_response(speech, decimal_comma):
+    speech = speech.replace(':\n\n', '').replace('\n\n', '. ').replace('\n', ',')
+    if decimal_comma:
+        speech = DECIMAL_POINT_PATTERN.sub(r"\1,\2", speech)
+    return REMOVED_CHARS_PATTERN.sub("", speech).replace('_', ' ')
+
+def measure(run, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    lf = import_lambda_function()
+    results = {}
+    for locale_name in ("en-US", "de-DE"):
+        locale = lf.load_locale(locale_name)
+        for size, answer in (("short", SHORT_ANSWER), ("5kb", LONG_ANSWER)):
+            results[f"{locale_name}_{size}"] = {
+                "current": measure(lambda: lf.improve_response(answer, locale), args.iterations),
+                "compiled": measure(lambda: compiled_improve_response(answer, locale.decimal_comma), args.iterations),
+                "same_output": compiled_improve_response(answer, locale.decimal_comma) == lf.improve_response(answer, locale),
+            }
+
+    write_results("improve_response", results, args.output)
+
+if __name__ == "__main__":
+    main()
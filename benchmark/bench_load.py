@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Load test of lambda_handler: replays synthetic Alexa requests (LaunchRequest, GptQueryIntent and
+CanFulfillIntentRequest, in every locale of lambda_functions/locale) against the local stub of
+Home Assistant (fake_ha.py). Reports the latency of each request type, the throughput with
+concurrent invocations and the memory of the process.
+
+    python benchmark/bench_load.py [--requests 300] [--concurrency 1,4,16] [--latency 0.05]
+                                   [--error-rate 0.05] [--answer-size 500] [--output results/load.json]
+
+The skill settings are read from the environment as usual, e.g.
+`response_cache_ttl=60 python benchmark/bench_load.py`. Concurrent invocations share one process,
+unlike Lambda containers, so they show the contention on the shared state (pools, caches, locks).
+"""
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common import import_lambda_function, summarize, write_results, list_locales, alexa_envelope, LambdaContext
+from fake_ha import start_fake_ha, sized_answer
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+REQUEST_TYPES = ("LaunchRequest", "GptQueryIntent", "CanFulfillIntentRequest")
+
+# Peak resident memory of the process, in MB
+def max_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class Replay:
+    def __init__(self, lf, locales):
+        self.lf = lf
+        self.locales = locales
+        self.errors = {"exceptions": 0, "error_answers": 0}
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def next_query(self):
+        with self.lock:
+            self.counter += 1
+            # A new question every time, so the response cache does not answer it
+            return f"what is the temperature of sensor {self.counter}"
+
+    # Sends one request to lambda_handler, returns its duration in seconds
+    def invoke(self, request_type, locale):
+        event = alexa_envelope(request_type, locale, query=self.next_query(), user_id=f"user-{locale}")
+        start = time.perf_counter()
+        try:
+            response = self.lf.lambda_handler(event, LambdaContext())
+        except Exception:
+            with self.lock:
+                self.errors["exceptions"] += 1
+            return time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+
+        speech = ((response.get("response") or {}).get("outputSpeech") or {}).get("ssml", "")
+        if request_type == "GptQueryIntent" and self.lf.load_locale(locale).get("alexa_speak_error") in speech:
+            with self.lock:
+                self.errors["error_answers"] += 1
+        return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="Requests of each pass")
+    parser.add_argument("--concurrency", default="1,4,16", help="Concurrent invocations of each throughput pass")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake Home Assistant takes to answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of the conversation requests failing with HTTP 500/502")
+    parser.add_argument("--answer-size", type=int, default=200, help="Characters of the conversation answer")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    server, url = start_fake_ha(latency=args.latency, chunk_delay=0, answer=sized_answer(args.answer_size), error_rate=args.error_rate)
+    os.environ["home_assistant_url"] = url
+    os.environ.setdefault("home_assistant_prewarm", "false")
+
+    rss_before_import = max_rss_mb()
+    start = time.perf_counter()
+    lf = import_lambda_function()
+    import_time = time.perf_counter() - start
+    rss_after_import = max_rss_mb()
+
+    locales = list_locales()
+    replay = Replay(lf, locales)
+
+    # Latency: each request type in every locale, one request at a time
+    samples = {request_type: [] for request_type in REQUEST_TYPES}
+    locale_samples = {locale: [] for locale in locales}
+    for index in range(args.requests):
+        request_type = REQUEST_TYPES[index % len(REQUEST_TYPES)]
+        locale = locales[(index // len(REQUEST_TYPES)) % len(locales)]
+        elapsed = replay.invoke(request_type, locale)
+        samples[request_type].append(elapsed)
+        locale_samples[locale].append(elapsed)
+
+    # Throughput: GptQueryIntent requests of all locales, with concurrent invocations
+    throughput = {}
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        durations = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for elapsed in pool.map(lambda index: replay.invoke("GptQueryIntent", locales[index % len(locales)]), range(args.requests)):
+                durations.append(elapsed)
+        wall = time.perf_counter() - start
+        throughput[str(concurrency)] = {"requests_per_second": args.requests / wall, "latency": summarize(durations)}
+
+    write_results("load", {
+        "settings": {
+            "requests": args.requests,
+            "ha_latency_s": args.latency,
+            "error_rate": args.error_rate,
+            "answer_size": args.answer_size,
+            "locales": len(locales),
+        },
+        "import_ms": import_time * 1000,
+        "latency": {request_type: summarize(values) for request_type, values in samples.items()},
+        "latency_by_locale_p50_ms": {locale: summarize(values).get("p50_ms") for locale, values in locale_samples.items()},
+        "throughput": throughput,
+        "errors": replay.errors,
+        "ha_requests": dict(server.requests),
+        "coalescing": lf.request_coalescer.stats(),
+        "circuit_breaker": lf.ha_circuit.stats(),
+        "memory": {
+            "max_rss_before_import_mb": rss_before_import,
+            "max_rss_after_import_mb": rss_after_import,
+            "max_rss_mb": max_rss_mb(),
+        },
+    }, args.output)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
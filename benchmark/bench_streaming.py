@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the time until the user hears the first sentence of a long answer, with and without
+streaming (enable_streaming_response), against the local stub of Home Assistant (fake_ha.py).
+
+    python benchmark/bench_streaming.py [--iterations 10] [--chunk-delay 0.2] [--output results/streaming.json]
+"""
+import os
+import time
+import argparse
+
+from common import import_lambda_function, summarize, write_results
+from fake_ha import start_fake_ha
+
+def measure(lf, locale, state, iterations):
+    first_sentence, total = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        heard = []
+
+        def on_first_sentence(sentence):
+            heard.append(time.perf_counter() - start)
+            return True
+
+        lf.process_conversation(f"summary {time.perf_counter()}", locale, state, None, on_first_sentence)
+        elapsed = time.perf_counter() - start
+        total.append(elapsed)
+        # Without streaming, nothing is heard before the whole answer
+        first_sentence.append(heard[0] if heard else elapsed)
+    return {"first_speech": summarize(first_sentence), "full_answer": summarize(total)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.2, help="Seconds between streamed chunks")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    servers = {mode: start_fake_ha(latency=args.latency, stream=mode, chunk_delay=args.chunk_delay) for mode in (None, "sse")}
+    os.environ["home_assistant_url"] = servers[None][1]
+    os.environ["enable_streaming_response"] = "true"
+    os.environ["home_assistant_prewarm"] = "false"
+    lf = import_lambda_function()
+    locale = lf.load_locale("en-US")
+
+    results = {}
+    for mode, (server, url) in servers.items():
+        lf.home_assistant_url = url
+        state = lf.SessionState("benchmark")
+        state.account_linking_token = "benchmark"
+        results["streamed" if mode else "whole_answer"] = measure(lf, locale, state, args.iterations)
+        server.shutdown()
+
+    write_results("streaming", results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the REST and websocket transports (home_assistant_transport) against the local stub of
+Home Assistant (fake_ha.py): the latency of a conversation request and of reading the launch
+prompt (assist_input_entity), which the websocket keeps in memory once subscribed.
+
+    python benchmark/bench_transport.py [--iterations 200] [--latency 0] [--output results/transport.json]
+
+Needs the websocket-client package. The stub runs on the same host, so the numbers show the
+per-request overhead of each transport, without the network round trips a real server adds.
+"""
+import os
+import time
+import argparse
+
+from common import import_lambda_function, summarize, write_results
+from fake_ha import start_fake_ha
+
+def measure(run, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the fake Home Assistant takes to answer a conversation")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    server, url = start_fake_ha(latency=args.latency, chunk_delay=0)
+    os.environ["home_assistant_url"] = url
+    os.environ["home_assistant_transport"] = "websocket"
+    os.environ["home_assistant_prewarm"] = "false"
+    lf = import_lambda_function()
+    if not lf.ha_websocket_enabled:
+        raise SystemExit("The websocket transport needs the websocket-client package")
+    locale = lf.load_locale("en-US")
+
+    results = {}
+    for transport in ("rest", "websocket"):
+        lf.ha_websocket_enabled = transport == "websocket"
+        state = lf.SessionState(f"benchmark-{transport}")
+        state.account_linking_token = f"benchmark-{transport}"
+        # The first call opens the connection (and subscribes to the prompt), it is not measured
+        lf.read_prompt_state(state.account_linking_token)
+        lf.process_conversation("warm up", locale, state)
+        counter = iter(range(args.iterations))
+        results[transport] = {
+            "conversation": measure(lambda: lf.process_conversation(f"question {next(counter)}", locale, state), args.iterations),
+            "read_prompt": measure(lambda: lf.read_prompt_state(state.account_linking_token), args.iterations),
+        }
+
+    results["ha_requests"] = dict(server.requests)
+    write_results("transport", results, args.output)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Shared helpers of the benchmark scripts
+import os
+import sys
+import json
+import time
+import uuid
+import platform
+import statistics
+from datetime import datetime, timezone
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda_functions")
+
+# Imports lambda_function the way AWS Lambda does: from its own folder, so the relative locale/APL paths resolve
+def import_lambda_function():
+    os.chdir(LAMBDA_DIR)
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+    import lambda_function
+    return lambda_function
+
+# Summarizes a list of durations (seconds) in milliseconds
+def summarize(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": samples[-1] * 1000,
+    }
+
+# Prints the results and, if requested, stores them as JSON to compare between versions
+def write_results(name, results, output=None):
+    document = {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    print(text)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+# Locales of the skill, one per language file
+def list_locales():
+    return sorted(name[:-len(".lang")] for name in os.listdir(os.path.join(LAMBDA_DIR, "locale")) if name.endswith(".lang"))
+
+# Synthetic Alexa request envelope, like doc/test.json, for LaunchRequest, GptQueryIntent or CanFulfillIntentRequest
+def alexa_envelope(request_type, locale="en-US", query=None, user_id="benchmark-user", device_id="benchmark-device", apl=True):
+    system = {
+        "application": {"applicationId": "amzn1.ask.skill.benchmark"},
+        "user": {"userId": f"amzn1.ask.account.{user_id}", "accessToken": "benchmark-access-token"},
+        "device": {
+            "deviceId": f"amzn1.ask.device.{device_id}",
+            "supportedInterfaces": {"Alexa.Presentation.APL": {}} if apl else {},
+        },
+    }
+    request = {
+        "type": "IntentRequest" if request_type == "GptQueryIntent" else request_type,
+        "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "locale": locale,
+    }
+    if request_type in ("GptQueryIntent", "CanFulfillIntentRequest"):
+        request["intent"] = {"name": "GptQueryIntent", "slots": {"query": {"name": "query", "value": query}}}
+    return {
+        "version": "1.0",
+        "session": {"new": request_type == "LaunchRequest", "sessionId": f"amzn1.echo-api.session.{user_id}"},
+        "context": {"System": system},
+        "request": request,
+    }
+
+# Stand-in for the Lambda context object, with the default 8 s timeout of the skill
+class LambdaContext:
+    def __init__(self, timeout=8):
+        self.deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Compares two result files of the same benchmark, e.g. before and after a change:
+
+    python benchmark/compare.py results/load-main.json results/load-branch.json [--threshold 10]
+
+Prints every number of the results with its change. With --threshold, exits with status 1 when
+a latency (*_ms) grew, or a throughput (requests_per_second) dropped, by more than that percentage.
+"""
+import sys
+import json
+import argparse
+
+# Numeric values of nested results, keyed by their path, e.g. "latency.GptQueryIntent.p95_ms"
+def flatten(results, prefix=""):
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+# Percentage by which the value got worse: positive for slower latencies or lower throughput
+def regression(path, old, new):
+    if not old:
+        return None
+    change = (new - old) / abs(old) * 100
+    if path.endswith("_ms"):
+        return change
+    if path.endswith("requests_per_second"):
+        return -change
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, help="Maximum regression allowed, in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        sys.exit(f"Different benchmarks: {baseline.get('benchmark')} and {candidate.get('benchmark')}")
+
+    old_values = flatten(baseline["results"])
+    new_values = flatten(candidate["results"])
+    regressions = []
+    width = max((len(path) for path in old_values), default=0)
+    for path, old in old_values.items():
+        if path not in new_values:
+            continue
+        new = new_values[path]
+        change = f"{(new - old) / abs(old) * 100:+.1f}%" if old else ""
+        print(f"{path:<{width}}  {old:>12.3f}  {new:>12.3f}  {change}")
+        worse = regression(path, old, new)
+        if args.threshold is not None and worse is not None and worse > args.threshold:
+            regressions.append(f"{path} {worse:+.1f}%")
+
+    if regressions:
+        print(f"\nRegressions above {args.threshold}%:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
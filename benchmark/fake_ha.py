@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Local stub of the Home Assistant API used by the skill, to run the Lambda function and the
+benchmarks without a real server. Latency, errors and the size of the answers are configurable,
+and the conversation answer can be streamed in chunks, as server-sent events or NDJSON. It also
+serves the websocket API (/api/websocket): auth, ping, conversation/process, get_states and
+subscribe_entities, with set_state() pushing state changes to the subscribers.
+
+    python benchmark/fake_ha.py [--port 8123] [--latency 0.3] [--error-rate 0.1] [--answer-size 2000] [--stream sse]
+"""
+import json
+import time
+import base64
+import struct
+import random
+import socket
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "The living room is at 21.5 degrees and all the lights are off. "
+    "The washing machine will finish in 25 minutes. "
+    "Tomorrow will be sunny, with a high of 24 degrees."
+)
+
+DEFAULT_STATES = {
+    "input_text.assistant_input": "",
+    "light.kitchen": "off",
+    "sensor.living_room_temperature": "21.5",
+}
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class FakeHomeAssistantHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in one write, otherwise delayed ACKs add ~40 ms to every answer
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.server.requests[f"GET {self.path.split('?')[0]}"] += 1
+        if self.path == "/manifest.json":
+            self.send_json(200, {"name": "Home Assistant"})
+        elif self.path == "/api/":
+            self.send_json(200, {"message": "API running."})
+        elif self.path == "/api/states":
+            self.send_json(200, list_states(self.server))
+        elif self.path.startswith("/api/states/"):
+            entity_id = self.path[len("/api/states/"):]
+            self.send_json(200, {"entity_id": entity_id, "state": self.server.states.get(entity_id, "")})
+        elif self.path == "/api/websocket" and self.server.options["websocket"] and self.headers.get("Upgrade", "").lower() == "websocket":
+            self.handle_websocket()
+        else:
+            self.send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        request = json.loads(body or b"{}")
+        options = self.server.options
+        self.server.requests[f"POST {self.path}"] += 1
+        if self.path != "/api/conversation/process":
+            self.send_json(404, {"message": "Not found"})
+            return
+
+        time.sleep(options["latency"])
+        # Failures of the agent or of the reverse proxy in front of Home Assistant
+        if options["error_rate"] and random.random() < options["error_rate"]:
+            self.send_json(random.choice((500, 502)), {"message": "Simulated error"})
+            return
+
+        result = conversation_result(request, options)
+        chunks = answer_chunks(options)
+        # Only clients accepting a stream get one, the others get the usual JSON body
+        accept = self.headers.get("Accept", "")
+        if not options["stream"] or ("event-stream" not in accept and "ndjson" not in accept):
+            # Without streaming, the answer is sent once it is fully generated
+            time.sleep(options["chunk_delay"] * (len(chunks) - 1))
+            self.send_json(200, result)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if options["stream"] == "sse" else "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # Assist pipeline events: the text deltas, then the final conversation result
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(options["chunk_delay"])
+            self.write_event({"type": "intent-progress", "data": {"chat_log_delta": {"content": chunk}}})
+        self.write_event({"type": "intent-end", "data": {"intent_output": result}})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_event(self, event):
+        line = json.dumps(event)
+        text = f"data: {line}\n\n" if self.server.options["stream"] == "sse" else f"{line}\n"
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    # Websocket API: the handshake, the authentication, then one command per message
+    def handle_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.websocket_lock = threading.Lock()
+
+        self.send_message({"type": "auth_required", "ha_version": "fake"})
+        message = self.receive_message()
+        access_token = self.server.options["access_token"]
+        if not message or message.get("type") != "auth" or not message.get("access_token") or access_token not in (None, message["access_token"]):
+            self.send_message({"type": "auth_invalid", "message": "Invalid access token"})
+            return
+        self.send_message({"type": "auth_ok", "ha_version": "fake"})
+        with self.server.lock:
+            self.server.websockets.add(self)
+        try:
+            while True:
+                message = self.receive_message()
+                if message is None:
+                    break
+                self.server.requests[f"WS {message.get('type')}"] += 1
+                if message.get("type") == "conversation/process":
+                    # Commands run concurrently, like the tasks of Home Assistant
+                    threading.Thread(target=self.websocket_conversation, args=(message,), daemon=True).start()
+                else:
+                    self.websocket_command(message)
+        except OSError:
+            pass
+        finally:
+            with self.server.lock:
+                self.server.websockets.discard(self)
+                for subscription in [s for s in self.server.subscriptions if s[0] is self]:
+                    self.server.subscriptions.remove(subscription)
+
+    def websocket_command(self, message):
+        message_id = message.get("id")
+        if message.get("type") == "ping":
+            self.send_message({"id": message_id, "type": "pong"})
+        elif message.get("type") == "get_states":
+            self.send_result(message_id, list_states(self.server))
+        elif message.get("type") == "subscribe_entities":
+            entity_ids = message.get("entity_ids") or list(self.server.states)
+            with self.server.lock:
+                self.server.subscriptions.append((self, message_id, entity_ids))
+                added = {entity_id: {"s": self.server.states[entity_id], "a": {}} for entity_id in entity_ids if entity_id in self.server.states}
+            self.send_result(message_id, None)
+            self.send_message({"id": message_id, "type": "event", "event": {"a": added}})
+        else:
+            self.send_message({"id": message_id, "type": "result", "success": False, "error": {"code": "unknown_command", "message": "Unknown command."}})
+
+    def websocket_conversation(self, message):
+        options = self.server.options
+        time.sleep(options["latency"])
+        try:
+            if options["error_rate"] and random.random() < options["error_rate"]:
+                self.send_message({"id": message["id"], "type": "result", "success": False, "error": {"code": "unknown_error", "message": "Simulated error"}})
+                return
+            time.sleep(options["chunk_delay"] * (len(answer_chunks(options)) - 1))
+            self.send_result(message["id"], conversation_result(message, options))
+        except (OSError, ValueError):
+            pass
+
+    def send_result(self, message_id, result):
+        self.send_message({"id": message_id, "type": "result", "success": True, "result": result})
+
+    def send_message(self, message):
+        self.write_frame(0x1, json.dumps(message).encode("utf-8"))
+
+    def write_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        with self.websocket_lock:
+            self.wfile.write(header + payload)
+            self.wfile.flush()
+
+    # Next text message of the client, None once the connection is closed
+    def receive_message(self):
+        while True:
+            header = self.rfile.read(2)
+            if len(header) < 2:
+                return None
+            opcode, length = header[0] & 0x0F, header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.rfile.read(8))[0]
+            mask = self.rfile.read(4) if header[1] & 0x80 else b""
+            payload = self.rfile.read(length)
+            if mask:
+                payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self.write_frame(0xA, payload)
+            elif opcode == 0x1:
+                return json.loads(payload)
+
+# Answer of the conversation API to a request
+def conversation_result(request, options):
+    return {
+        "conversation_id": request.get("conversation_id") or "fake-conversation",
+        "response": {
+            "response_type": "query_answer",
+            "speech": {"plain": {"speech": options["answer"]}},
+            "data": {},
+        },
+    }
+
+# Text chunks as they would come from the LLM, chunk_delay seconds apart
+def answer_chunks(options):
+    words = options["answer"].split(" ")
+    size = options["chunk_words"]
+    return [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+
+def list_states(server):
+    return [
+        {"entity_id": entity_id, "state": state, "attributes": {"friendly_name": entity_id.split(".")[1].replace("_", " ").title()}}
+        for entity_id, state in server.states.items()
+    ]
+
+# Changes the state of an entity and pushes it to the websocket subscribers, like an automation would
+def set_state(server, entity_id, state):
+    with server.lock:
+        server.states[entity_id] = state
+        subscribers = [(handler, message_id) for handler, message_id, entity_ids in server.subscriptions if entity_id in entity_ids]
+    for handler, message_id in subscribers:
+        handler.send_message({"id": message_id, "type": "event", "event": {"c": {entity_id: {"+": {"s": state}}}}})
+
+# Closes the open websockets, like a restart of Home Assistant
+def drop_websockets(server):
+    with server.lock:
+        handlers = list(server.websockets)
+    for handler in handlers:
+        handler.connection.shutdown(socket.SHUT_RDWR)
+
+# Answer of about size characters, repeating the default answer
+def sized_answer(size):
+    return (DEFAULT_ANSWER + " ") * (size // (len(DEFAULT_ANSWER) + 1)) + DEFAULT_ANSWER[:size % (len(DEFAULT_ANSWER) + 1)]
+
+# Starts the stub in a background thread, returns the server and its URL
+def start_fake_ha(port=0, latency=0.0, stream=None, chunk_delay=0.1, chunk_words=4, answer=DEFAULT_ANSWER, error_rate=0.0, websocket=True, access_token=None):
+    """
+    Args:
+        websocket: Serve the websocket API, otherwise /api/websocket answers 404 like a proxy without websockets
+        access_token: The only token accepted by the websocket authentication, None accepts any token
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeHomeAssistantHandler)
+    server.daemon_threads = True
+    server.options = {
+        "latency": latency,
+        "stream": stream,
+        "chunk_delay": chunk_delay,
+        "chunk_words": chunk_words,
+        "answer": answer,
+        "error_rate": error_rate,
+        "websocket": websocket,
+        "access_token": access_token,
+    }
+    server.states = dict(DEFAULT_STATES)
+    # Number of requests per "METHOD /path", and of websocket commands per "WS type"
+    server.requests = Counter()
+    server.websockets = set()
+    server.subscriptions = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the answer starts")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of the conversation requests answered with an HTTP 500/502")
+    parser.add_argument("--answer-size", type=int, help="Characters of the answer, instead of --answer")
+    parser.add_argument("--stream", choices=("sse", "ndjson"), help="Stream the answer instead of one JSON body")
+    parser.add_argument("--chunk-delay", type=float, default=0.1, help="Seconds between streamed chunks")
+    parser.add_argument("--chunk-words", type=int, default=4, help="Words per streamed chunk")
+    parser.add_argument("--answer", default=DEFAULT_ANSWER)
+    args = parser.parse_args()
+
+    answer = sized_answer(args.answer_size) if args.answer_size else args.answer
+    server, url = start_fake_ha(args.port, args.latency, args.stream, args.chunk_delay, args.chunk_words, answer, args.error_rate)
+    print(f"Fake Home Assistant listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
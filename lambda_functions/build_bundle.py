@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiles the locale/*.lang files and the APL templates into bundle.json, so the
+Lambda function reads a single file on cold start. Run it from this folder before
+packaging, after any change to the locale or APL files (a stale bundle wins over them):
+
+    python build_bundle.py
+"""
+import os
+import glob
+import json
+
+from skill_files import BUNDLE_FILE, load_lang_file
+
+TEMPLATES = ("apl_openha.json", "apl_empty.json")
+
+def build_bundle():
+    locales = {}
+    for file_name in sorted(glob.glob("locale/*.lang")):
+        locale_name = os.path.splitext(os.path.basename(file_name))[0]
+        locales[locale_name] = load_lang_file(file_name)
+
+    templates = {}
+    for file_name in TEMPLATES:
+        with open(file_name, encoding='utf-8') as f:
+            templates[file_name] = json.load(f)
+
+    with open(BUNDLE_FILE, "w", encoding='utf-8') as f:
+        json.dump({"locales": locales, "templates": templates}, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"{BUNDLE_FILE}: {len(locales)} locales, {len(templates)} templates")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    build_bundle()
@@ -6,60 +6,210 @@ if not sys.warnoptions:
     warnings.filterwarnings("ignore", category=SyntaxWarning)
 
 import os
-import re
-import logging
-import json
-import random
-import asyncio
-import uuid
-import requests
-import requests.exceptions
-import ask_sdk_core.utils as ask_utils
-
-from ask_sdk_core.skill_builder import CustomSkillBuilder
-from ask_sdk_core.api_client import DefaultApiClient
-from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
-from ask_sdk_model.interfaces.alexa.presentation.apl import RenderDocumentDirective, ExecuteCommandsDirective, OpenUrlCommand
-from ask_sdk_model.services.directive import (
-    SendDirectiveRequest, Header, SpeakDirective
-)
-from datetime import datetime, timezone, timedelta
-from concurrent.futures import ThreadPoolExecutor
+import time
+import contextlib
+
+# Startup profile: time of each import and init step of the cold start, logged with startup_profile = true
+startup_profile = str(os.environ.get('startup_profile', 'False')).lower()
+startup_started = time.perf_counter()
+startup_timings = {}
 
-# Load configurations and localization
-def load_config(file_name):
-    if str(file_name).endswith(".lang") and not os.path.exists(file_name):
-        file_name = "locale/en-US.lang"
+@contextlib.contextmanager
+def profile_step(name):
+    start = time.perf_counter()
     try:
-        with open(file_name, encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or '=' not in line:
-                    continue
-                name, value = line.split('=', 1)
-                # Store in global vars
-                globals()[name] = value
-    except Exception as e:
-        logger.error(f"Error loading file: {str(e)}")
+        yield
+    finally:
+        startup_timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+with profile_step("import stdlib"):
+    import re
+    import logging
+    import json
+    import copy
+    import random
+    import functools
+    import asyncio
+    import uuid
+    import threading
+    import contextvars
+    import select
+
+with profile_step("import requests"):
+    import requests
+    import requests.exceptions
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# The APL models are imported where they are used, only devices with a screen need them
+with profile_step("import ask_sdk_core"):
+    import ask_sdk_core.utils as ask_utils
+    from ask_sdk_core.skill_builder import CustomSkillBuilder
+    from ask_sdk_core.api_client import DefaultApiClient
+    from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
+    # Already loaded by ask_sdk_core itself, importing it here costs nothing
+    from ask_sdk_model.services.directive import SendDirectiveRequest, Header, SpeakDirective
+
+from types import MappingProxyType
+from collections import OrderedDict, Counter, deque
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
 
-# Initial config load
-load_config("locale/en-US.lang")
+from skill_files import BUNDLE_FILE, load_lang_file
 
 # Log configuration
 debug = bool(os.environ.get('debug', False))
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG if debug else logging.INFO)
 
+# Immutable texts and pre-split keyword lists of one locale
+class Locale:
+    __slots__ = ("name", "region", "texts", "exit_phrases", "keywords_open_dashboard", "keywords_close_skill", "keyword_matcher", "local_intents", "articles", "decimal_comma", "command_splitter", "follow_up_pattern")
+
+    def __init__(self, name, texts):
+        set_attr = super().__setattr__
+        set_attr("name", name)
+        # "de-DE" -> "DE" to respect regional differences in number handling like 2.4°C / 2,4°C
+        set_attr("region", name.split("-")[1])
+        set_attr("texts", MappingProxyType(texts))
+        set_attr("exit_phrases", split_list(texts.get("alexa_speak_exit", "")))
+        set_attr("keywords_open_dashboard", tuple(k.lower() for k in split_list(texts.get("keywords_to_open_dashboard", ""))))
+        set_attr("keywords_close_skill", tuple(k.lower() for k in split_list(texts.get("keywords_to_close_skill", ""))))
+        set_attr("keyword_matcher", KeywordMatcher([
+            ("open_dashboard", self.keywords_open_dashboard, False, None),
+            *((f"custom:{phrase}", (phrase,), True, None) for phrase in custom_keyword_actions),
+            # Close the skill only if the query has 3 or fewer words
+            ("close_skill", self.keywords_close_skill, True, 3),
+        ]))
+        set_attr("local_intents", compile_local_intents(texts))
+        set_attr("articles", tuple(a.lower() for a in split_list(texts.get("local_intent_articles", ""))))
+        set_attr("decimal_comma", texts.get("decimal_separator", ".") == ",")
+        set_attr("command_splitter", compile_command_splitter(texts))
+        set_attr("follow_up_pattern", compile_follow_up_pattern(texts))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Locale is immutable")
+
+    def get(self, key, default=None):
+        return self.texts.get(key, default)
+
+# Matches every keyword action of a locale in a single pass over the query
+class KeywordMatcher:
+    def __init__(self, actions):
+        """
+        Args:
+            actions: List of (action, phrases, whole_word, max_words) in priority order. whole_word
+                matches the phrase only between word boundaries and max_words limits the query
+                length the action is allowed for
+        """
+        self.actions = []
+        groups = []
+        for action, phrases, whole_word, max_words in actions:
+            if not phrases:
+                continue
+            # Longer phrases first, so "open home assistant" wins over "open home"
+            alternation = "|".join(re.escape(p.lower()) for p in sorted(phrases, key=len, reverse=True))
+            pattern = r'\b(?:' + alternation + r')\b' if whole_word else '(?:' + alternation + ')'
+            groups.append(f"(?P<k{len(self.actions)}>{pattern})")
+            self.actions.append((action, max_words))
+        self.pattern = re.compile("|".join(groups)) if groups else None
+
+    def match(self, query):
+        """
+        Returns:
+            Tuple of (action, matched phrase) of the highest priority match, or None
+        """
+        if not self.pattern:
+            return None
+        query = query.lower()
+        word_count = len(query.split())
+        best = None
+        for m in self.pattern.finditer(query):
+            index = int(m.lastgroup[1:])
+            max_words = self.actions[index][1]
+            if max_words is not None and word_count > max_words:
+                continue
+            if best is None or index < best[0]:
+                best = (index, m.group())
+        return (self.actions[best[0]][0], best[1]) if best else None
+
+# Parses the user-defined keyword actions: {"phrase": {"service": "domain.service", "data": {...}, "speech": "..."}}
+def load_custom_keyword_actions():
+    try:
+        actions = json.loads(os.environ.get('keyword_actions', '') or '{}')
+        return {phrase.strip().lower(): action for phrase, action in actions.items() if "service" in action}
+    except Exception as e:
+        logger.error(f"Invalid 'keyword_actions' environment variable: {e}")
+        return {}
+
+# Compiles the local_intent_* phrase templates of a locale, e.g. "turn on {name}", into (service, regex) pairs
+def compile_local_intents(texts):
+    intents = []
+    for service in ("turn_on", "turn_off", "toggle", "set"):
+        for template in split_list(texts.get(f"local_intent_{service}", "")):
+            pattern = re.escape(template.lower())
+            pattern = pattern.replace(r"\{name\}", r"(?P<name>.+?)").replace(r"\{value\}", r"(?P<value>\d+(?:[.,]\d+)?)\s*%?")
+            intents.append((service, re.compile(pattern)))
+    return tuple(intents)
+
+# Pattern matching the conjunctions between the commands of one utterance, e.g. " and then "
+def compile_command_splitter(texts):
+    conjunctions = sorted(split_list(texts.get("conjunctions", "").lower()), key=len, reverse=True)
+    if not conjunctions:
+        return None
+    return re.compile(r"\s*,?\s+(?:" + "|".join(re.escape(c) for c in conjunctions) + r")\s+", re.IGNORECASE)
+
+# Pattern matching a query that starts with a conjunction, a follow-up like "and the kitchen?"
+def compile_follow_up_pattern(texts):
+    conjunctions = sorted(split_list(texts.get("conjunctions", "").lower()), key=len, reverse=True)
+    if not conjunctions:
+        return None
+    return re.compile(r"(?:" + "|".join(re.escape(c) for c in conjunctions) + r")\s", re.IGNORECASE)
+
+# Splits a ";" separated locale value, ignoring empty entries
+def split_list(value):
+    return tuple(item.strip() for item in value.split(";") if item.strip())
+
+# Locale texts and APL templates precompiled by build_bundle.py into a single file, read once per container
+@functools.lru_cache(maxsize=None)
+def load_bundle():
+    try:
+        with profile_step("bundle"), open(BUNDLE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error loading {BUNDLE_FILE}, using the locale and APL files: {e}")
+        return None
+
+# Loads each locale only once per container, falling back to en-US when the language has no .lang file
+@functools.lru_cache(maxsize=None)
+def load_locale(locale_name):
+    bundle = load_bundle()
+    if bundle is not None:
+        texts = bundle["locales"].get(locale_name)
+        if texts is None:
+            return load_locale("en-US") if locale_name != "en-US" else Locale(locale_name, {})
+        return Locale(locale_name, dict(texts))
+
+    file_name = f"locale/{locale_name}.lang"
+    if not os.path.exists(file_name):
+        return load_locale("en-US") if locale_name != "en-US" else Locale(locale_name, {})
+    try:
+        return Locale(locale_name, load_lang_file(file_name))
+    except Exception as e:
+        logger.error(f"Error loading file: {str(e)}")
+        return load_locale("en-US") if locale_name != "en-US" else Locale(locale_name, {})
+
 # Thread pool max workers
-executor = ThreadPoolExecutor(max_workers=5)
+executor_max_workers = int(os.environ.get('executor_max_workers', 5))
+executor = ThreadPoolExecutor(max_workers=executor_max_workers)
+# Persistent event loop, running in its own thread and reused by every request of the warm container
+event_loop = asyncio.new_event_loop()
+threading.Thread(target=event_loop.run_forever, name="event-loop", daemon=True).start()
 # Note: config.cfg stores values as strings; we'll normalize expected boolean
 # flags to lowercase strings ("true"/"false") and compare explicitly.
-# Globals for conversation
-conversation_id = None
-last_interaction_date = None
-is_apl_supported = False
-account_linking_token = None
-user_locale = "US"  # Default locale
 home_assistant_url = os.environ.get('home_assistant_url', "").strip("/")
 apl_document_token = str(uuid.uuid4())
 assist_input_entity = os.environ.get('assist_input_entity', "input_text.assistant_input")
@@ -68,19 +218,730 @@ home_assistant_kioskmode = str(os.environ.get('home_assistant_kioskmode', 'False
 ask_for_further_commands = str(os.environ.get('ask_for_further_commands', 'False')).lower()
 suppress_greeting = str(os.environ.get('suppress_greeting', 'False')).lower()
 enable_acknowledgment_sound = str(os.environ.get('enable_acknowledgment_sound', 'False')).lower()
+launch_prompt_timeout = float(os.environ.get('launch_prompt_timeout', 2))
+custom_keyword_actions = load_custom_keyword_actions()
+enable_local_intents = str(os.environ.get('enable_local_intents', 'False')).lower()
+local_intents_sync_interval = float(os.environ.get('local_intents_sync_interval', 300))
+response_cache_ttl = float(os.environ.get('response_cache_ttl', 0))
+response_cache_size = int(os.environ.get('response_cache_size', 64))
+request_coalescing_window = float(os.environ.get('request_coalescing_window', 0))
+request_coalescing_size = int(os.environ.get('request_coalescing_size', 32))
+session_store_backend = os.environ.get('session_store', 'memory').lower()
+session_store_path = os.environ.get('session_store_path', '/tmp/ha_sessions.db')
+session_store_ttl = float(os.environ.get('session_store_ttl', 86400))
+session_store_size = int(os.environ.get('session_store_size', 100))
+acknowledgment_delay = float(os.environ.get('acknowledgment_delay', 3))
+request_deadline = float(os.environ.get('request_deadline', 7))
+deadline_margin = float(os.environ.get('deadline_margin', 1))
+template_cache_size = int(os.environ.get('template_cache_size', 32))
+enable_streaming_response = str(os.environ.get('enable_streaming_response', 'False')).lower()
+prefetch_ttl = float(os.environ.get('prefetch_ttl', 10))
+enable_multi_command = str(os.environ.get('enable_multi_command', 'False')).lower()
+
+# Home Assistant HTTP client settings
+home_assistant_pool_size = int(os.environ.get('home_assistant_pool_size', 10))
+home_assistant_connect_timeout = float(os.environ.get('home_assistant_connect_timeout', 3.05))
+home_assistant_read_timeout = float(os.environ.get('home_assistant_read_timeout', 30))
+home_assistant_http2 = str(os.environ.get('home_assistant_http2', 'False')).lower()
+home_assistant_prewarm = str(os.environ.get('home_assistant_prewarm', 'True')).lower()
+home_assistant_transport = os.environ.get('home_assistant_transport', 'rest').lower()
+circuit_breaker_failure_rate = float(os.environ.get('circuit_breaker_failure_rate', 0.5))
+circuit_breaker_min_calls = int(os.environ.get('circuit_breaker_min_calls', 3))
+circuit_breaker_window = float(os.environ.get('circuit_breaker_window', 60))
+circuit_breaker_cooldown = float(os.environ.get('circuit_breaker_cooldown', 30))
+
+# Per-invocation metrics settings
+enable_metrics = str(os.environ.get('enable_metrics', 'False')).lower()
+metrics_namespace = os.environ.get('metrics_namespace', 'HomeAssistantAssist')
+metrics_file = os.environ.get('metrics_file', '')
+
+# Timing spans (ms) and dimensions of one invocation, emitted as one CloudWatch Embedded Metric Format record
+class InvocationMetrics:
+    DIMENSIONS = ("ColdStart", "CacheHit", "ResponseType")
+
+    def __init__(self, cold_start):
+        self.spans = {}
+        self.dimensions = {"ColdStart": str(cold_start).lower(), "CacheHit": "false", "ResponseType": "none"}
+        self.properties = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add_span(self, name, milliseconds):
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0) + milliseconds
+
+    def add_count(self, name, count=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + count
+
+    def to_emf(self):
+        spans = {name: round(milliseconds, 3) for name, milliseconds in self.spans.items()}
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": metrics_namespace,
+                    "Dimensions": [list(self.DIMENSIONS)],
+                    "Metrics": [{"Name": name, "Unit": "Milliseconds"} for name in spans]
+                        + [{"Name": name, "Unit": "Count"} for name in self.counts],
+                }],
+            },
+            **self.dimensions,
+            **self.properties,
+            **spans,
+            **self.counts,
+        }
+
+# Metrics of the invocation being handled. The executor threads get it through contextvars.copy_context
+current_metrics = contextvars.ContextVar("current_metrics", default=None)
+metrics_file_lock = threading.Lock()
+
+# Adds the duration of each call of the decorated function to the span name of the invocation
+def timed_span(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            record = current_metrics.get()
+            if record is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record.add_span(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+def set_metric_dimension(name, value):
+    record = current_metrics.get()
+    if record is not None:
+        record.dimensions[name] = str(value).lower() if isinstance(value, bool) else str(value)
+
+def add_metric_count(name, count=1):
+    record = current_metrics.get()
+    if record is not None:
+        record.add_count(name, count)
+
+# Writes the record of one invocation to the log (read by CloudWatch as EMF) and/or to metrics_file
+def emit_metrics(record):
+    line = json.dumps(record.to_emf())
+    if enable_metrics == "true":
+        print(line, flush=True)
+    if metrics_file:
+        try:
+            with metrics_file_lock, open(metrics_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Unable to write metrics to {metrics_file}: {e}")
+
+# Milliseconds the current thread spent opening connections to Home Assistant. The connection of
+# a call is opened in the thread sending it, so parallel calls do not see each other's connect time
+ha_connect_time = threading.local()
+
+# Adds the time to open a connection to Home Assistant (TCP + TLS) to the ha_connect span
+@contextlib.contextmanager
+def profile_ha_connect():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        milliseconds = (time.perf_counter() - start) * 1000
+        ha_connect_time.milliseconds = getattr(ha_connect_time, "milliseconds", 0) + milliseconds
+        record = current_metrics.get()
+        if record is not None:
+            record.add_span("ha_connect", milliseconds)
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        with profile_ha_connect():
+            super().connect()
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with profile_ha_connect():
+            super().connect()
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+# Connection pools of the HTTP/1.1 client use the connections above
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+# Builds the shared HTTP client used for every Home Assistant call
+def create_ha_client():
+    """
+    Creates a pooled, keep-alive HTTP client. It lives at module level, so warm
+    Lambda invocations reuse the connections already open to Home Assistant.
+
+    Returns:
+        Tuple of (client, is_http2)
+    """
+    if home_assistant_http2 == "true":
+        try:
+            import httpx
+            client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=home_assistant_pool_size, max_keepalive_connections=home_assistant_pool_size),
+            )
+            logger.debug("Using HTTP/2 client for Home Assistant")
+            return client, True
+        except ImportError as e:
+            # httpx (or its h2 extra) is not bundled, keep the default HTTP/1.1 client
+            logger.warning(f"HTTP/2 is not available, falling back to HTTP/1.1: {e}")
+
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=home_assistant_pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session, False
+
+with profile_step("http client"):
+    ha_client, ha_http2_enabled = create_ha_client()
+ha_timeout_errors = (requests.exceptions.Timeout,)
+# Errors meaning that Home Assistant could not be reached at all (refused, DNS, connect timeout)
+ha_connection_errors = (requests.exceptions.ConnectionError,)
+if ha_http2_enabled:
+    import httpx
+    ha_timeout_errors += (httpx.TimeoutException,)
+    ha_connection_errors += (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Builds the per-call connect/read timeout in the format of the active client
+def ha_timeout(read_timeout=None):
+    read_timeout = read_timeout or home_assistant_read_timeout
+    if ha_http2_enabled:
+        return httpx.Timeout(read_timeout, connect=home_assistant_connect_timeout)
+    return (home_assistant_connect_timeout, read_timeout)
+
+# Raised instead of calling Home Assistant while the circuit breaker is open
+class HomeAssistantUnreachableError(Exception):
+    pass
+
+# Answers of a reverse proxy whose Home Assistant is down
+HA_UNAVAILABLE_STATUS = {502, 503, 504}
+
+# Stops calling Home Assistant while it is unreachable, shared by all the requests of the container
+class CircuitBreaker:
+    """
+    closed: calls go through, and the circuit opens when at least failure_rate of the calls of
+    the last window seconds (and min_calls of them) could not reach Home Assistant.
+    open: calls fail right away with HomeAssistantUnreachableError. After cooldown seconds, a
+    health probe of /api/ runs in the background and closes the circuit once it succeeds.
+    half_open: the cooldown is over, one call goes through to test Home Assistant.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate, min_calls, window, cooldown):
+        self.failure_rate = failure_rate
+        self.min_calls = max(min_calls, 1)
+        self.window = window
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0
+        self.results = deque()
+        self.trial_running = False
+        self.probe_scheduled = False
+        # Token of the last call, for the health probe: a call without it would count as a failed login in HA
+        self.probe_token = None
+        # Since the container started: times the circuit opened, and calls rejected while it was open
+        self.opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def call(self, send, token=None):
+        """
+        Sends one call through the breaker.
+
+        Args:
+            send: Function sending the request and returning the response
+            token: Home Assistant access token of the call
+
+        Returns:
+            The response of send
+        """
+        if not self.allow_request():
+            self.count_rejected()
+            raise HomeAssistantUnreachableError("Home Assistant is unreachable, circuit breaker is open")
+        if token:
+            self.probe_token = token
+        try:
+            response = send()
+        except ha_connection_errors:
+            self.record(failed=True)
+            raise
+        except Exception:
+            # Read timeouts and the like: Home Assistant was reached
+            self.record(failed=False)
+            raise
+        self.record(failed=response.status_code in HA_UNAVAILABLE_STATUS)
+        return response
+
+    def allow_request(self):
+        if self.failure_rate <= 0:
+            return True
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                logger.info("Circuit breaker half open, testing Home Assistant with the next call")
+                self.state = self.HALF_OPEN
+                self.trial_running = False
+            if self.state == self.HALF_OPEN and not self.trial_running:
+                self.trial_running = True
+                return True
+            return self.state == self.CLOSED
+
+    # True while calls are rejected, without using the half-open test call
+    def rejects_requests(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.cooldown
+            return self.state == self.HALF_OPEN and self.trial_running
+
+    # Counts a call answered without calling Home Assistant because the circuit is open
+    def count_rejected(self):
+        with self.lock:
+            self.rejected += 1
+        add_metric_count("CircuitBreakerRejected")
+
+    def record(self, failed):
+        if self.failure_rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if self.state != self.CLOSED:
+                # Result of the half-open test call, or of a call started before the circuit opened
+                if not failed:
+                    self.close()
+                elif self.state == self.HALF_OPEN:
+                    self.open(now)
+                return
+
+            self.results.append((now, failed))
+            while self.results[0][0] < now - self.window:
+                self.results.popleft()
+            failures = sum(1 for _, result_failed in self.results if result_failed)
+            if len(self.results) >= self.min_calls and failures / len(self.results) >= self.failure_rate:
+                logger.warning(
+                    f"Home Assistant is unreachable: {failures} of the last {len(self.results)} calls failed "
+                    f"(circuit_breaker_failure_rate {self.failure_rate}, circuit_breaker_min_calls {self.min_calls})"
+                )
+                self.open(now)
+
+    # Both called with the lock held
+    def open(self, now):
+        if self.state != self.OPEN:
+            self.opened += 1
+            add_metric_count("CircuitBreakerOpened")
+            logger.warning(
+                f"Circuit breaker open: Alexa answers alexa_speak_unreachable without calling Home Assistant "
+                f"until a health check succeeds, the first one in {self.cooldown}s (circuit_breaker_cooldown)"
+            )
+        self.state = self.OPEN
+        self.opened_at = now
+        self.results.clear()
+        self.trial_running = False
+        if not self.probe_scheduled:
+            self.probe_scheduled = True
+            timer = threading.Timer(self.cooldown, self.probe)
+            timer.daemon = True
+            timer.start()
+
+    def close(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Home Assistant is reachable again, circuit breaker closed ({self.rejected} calls rejected since the container started)")
+        self.state = self.CLOSED
+        self.results.clear()
+        self.trial_running = False
+
+    # Background health check of Home Assistant while the circuit is open
+    def probe(self):
+        with self.lock:
+            self.probe_scheduled = False
+            if self.state == self.CLOSED:
+                return
+        try:
+            headers = {"Authorization": "Bearer {}".format(self.probe_token)} if self.probe_token else {}
+            # Without a token, a public resource tells whether the server is up
+            path = "/api/" if self.probe_token else "/manifest.json"
+            response = ha_client.request("GET", f"{home_assistant_url}{path}", headers=headers, timeout=ha_timeout(5))
+            healthy = response.status_code not in HA_UNAVAILABLE_STATUS
+        except Exception as e:
+            logger.debug(f"Home Assistant health probe failed: {e}")
+            healthy = False
+        with self.lock:
+            if healthy:
+                self.close()
+            elif self.state != self.CLOSED:
+                self.open(time.monotonic())
+
+    def stats(self):
+        return {"state": self.state, "calls": len(self.results), "opened": self.opened, "rejected": self.rejected}
+
+ha_circuit = CircuitBreaker(circuit_breaker_failure_rate, circuit_breaker_min_calls, circuit_breaker_window, circuit_breaker_cooldown)
+
+# Sends a request to the Home Assistant API through the shared client
+def ha_request(method, path, token, json_data=None, read_timeout=None):
+    with ha_call(method, path, token, json_data, read_timeout) as response:
+        read_response_body(response)
+    return response
+
+# Content types of a streamed answer: server-sent events or one JSON object per line
+HA_STREAM_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson")
+
+# Sends a request to the Home Assistant API without reading the body, to consume a streamed answer as it arrives
+def ha_stream(method, path, token, json_data=None, read_timeout=None):
+    return ha_call(method, path, token, json_data, read_timeout, accept=", ".join(HA_STREAM_CONTENT_TYPES + ("application/json",)))
+
+# Opens one Home Assistant call through the circuit breaker, recording its time to first byte and body spans
+@contextlib.contextmanager
+def ha_call(method, path, token, json_data=None, read_timeout=None, accept=None):
+    headers = {
+        "Authorization": "Bearer {}".format(token),
+        "Content-Type": "application/json",
+    }
+    if accept:
+        headers["Accept"] = accept
+    url = f"{home_assistant_url}{path}"
+    if ha_http2_enabled:
+        send = lambda: ha_client.send(ha_client.build_request(method, url, headers=headers, json=json_data, timeout=ha_timeout(read_timeout)), stream=True)
+    else:
+        send = lambda: ha_client.request(method, url, headers=headers, json=json_data, timeout=ha_timeout(read_timeout), stream=True)
+
+    record = current_metrics.get()
+    connect_before = getattr(ha_connect_time, "milliseconds", 0)
+    start = time.perf_counter()
+    # The call returns once the response headers arrived, the body is read afterwards
+    response = ha_circuit.call(send, token)
+    headers_received = time.perf_counter()
+    # Connect time of this call only, already counted in ha_connect
+    connect = getattr(ha_connect_time, "milliseconds", 0) - connect_before
+    try:
+        yield response
+    finally:
+        response.close()
+        if record is not None:
+            record.add_span("ha_ttfb", (headers_received - start) * 1000 - connect)
+            record.add_span("ha_body", (time.perf_counter() - headers_received) * 1000)
+
+# Iterates the lines of a response opened with ha_stream, as they arrive
+def iter_response_lines(response):
+    if ha_http2_enabled:
+        return response.iter_lines()
+    response.encoding = response.encoding or "utf-8"
+    return response.iter_lines(decode_unicode=True)
+
+# Reads the whole body of a response opened with ha_call, so it stays usable after the connection is released
+def read_response_body(response):
+    if ha_http2_enabled:
+        response.read()
+    else:
+        response.content
+
+# Opens the connection to Home Assistant during cold start, so the first utterance skips the TCP/TLS handshake
+def prewarm_ha_connection():
+    try:
+        # There is no token yet, so use a public resource: a 401 would count as a failed login in HA
+        ha_client.request("GET", f"{home_assistant_url}/manifest.json", timeout=ha_timeout(5))
+        logger.debug("Home Assistant connection pre-warmed")
+    except Exception as e:
+        logger.debug(f"Unable to pre-warm Home Assistant connection: {e}")
+
+if home_assistant_url and home_assistant_prewarm == "true":
+    executor.submit(prewarm_ha_connection)
+
+# The websocket transport needs websocket-client, which is optional in the deployment package
+ha_websocket_enabled = False
+if home_assistant_transport == "websocket":
+    try:
+        with profile_step("import websocket"):
+            import websocket
+        ha_websocket_enabled = True
+        # A conversation sent over the websocket may time out waiting for its result
+        ha_timeout_errors += (FutureTimeoutError,)
+    except ImportError as e:
+        logger.warning(f"Websocket transport is not available, falling back to REST: {e}")
+
+# The command was not sent over the websocket, so it is safe to send it over REST instead
+class HomeAssistantWebSocketError(Exception):
+    pass
+
+# Authenticated websocket to Home Assistant, kept open across warm invocations
+class HomeAssistantWebSocket:
+    # Seconds without any message after which the connection is pinged before use: HA closes
+    # connections that missed its heartbeat, e.g. while the Lambda container was frozen
+    IDLE_CHECK = 30
+
+    def __init__(self, token):
+        self.token = token
+        self.connection = None
+        self.closed = True
+        self.next_id = 1
+        # Futures waiting for a result, and event callbacks of the subscriptions, by message id
+        self.pending = {}
+        self.subscriptions = {}
+        # Latest state of the watched entities, pushed by Home Assistant
+        self.states = {}
+        self.watched = {}
+        self.last_received = 0
+        self.dispatching = False
+        # After a failed connection, REST is used until this time instead of retrying every request
+        self.retry_at = 0
+        self.lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+
+    def connect(self):
+        url = re.sub(r"^http", "ws", home_assistant_url) + "/api/websocket"
+        connection = websocket.create_connection(url, timeout=home_assistant_connect_timeout)
+        try:
+            message = json.loads(connection.recv())
+            if message.get("type") == "auth_required":
+                connection.send(json.dumps({"type": "auth", "access_token": self.token}))
+                message = json.loads(connection.recv())
+            if message.get("type") != "auth_ok":
+                raise HomeAssistantWebSocketError(f"Websocket authentication failed: {message.get('message', message.get('type'))}")
+        except Exception:
+            connection.close()
+            raise
+        connection.settimeout(None)
+        with self.lock:
+            self.connection = connection
+            self.closed = False
+            self.last_received = time.monotonic()
+        threading.Thread(target=self.read_loop, args=(connection,), name="ha-websocket", daemon=True).start()
+        logger.debug("Home Assistant websocket connected")
+
+    # Connects, or checks that a connection idle for a while is still alive
+    def ensure_open(self):
+        with self.connect_lock:
+            if not self.closed and time.monotonic() - self.last_received > self.IDLE_CHECK:
+                try:
+                    self.call({"type": "ping"}, home_assistant_connect_timeout)
+                except Exception as e:
+                    logger.debug(f"Home Assistant websocket is stale, reconnecting: {e}")
+                    self.close()
+            if self.closed:
+                if time.monotonic() < self.retry_at:
+                    raise HomeAssistantWebSocketError("Home Assistant websocket not connected, retrying later")
+                try:
+                    self.connect()
+                except Exception:
+                    self.retry_at = time.monotonic() + circuit_breaker_cooldown
+                    raise
+
+    # Receives the messages of one connection until it is closed
+    def read_loop(self, connection):
+        error = None
+        try:
+            while True:
+                message = connection.recv()
+                if not message:
+                    raise ConnectionError("Home Assistant closed the websocket")
+                self.dispatching = True
+                self.last_received = time.monotonic()
+                self.dispatch(json.loads(message))
+                self.dispatching = False
+        except Exception as e:
+            error = e
+        finally:
+            self.dispatching = False
+            if connection is self.connection:
+                logger.debug(f"Home Assistant websocket closed: {error}")
+                self.close(error)
+
+    def dispatch(self, message):
+        if message.get("type") == "event":
+            callback = self.subscriptions.get(message.get("id"))
+            if callback is not None:
+                callback(message.get("event", {}))
+            return
+        with self.lock:
+            future = self.pending.pop(message.get("id"), None)
+        if future is not None:
+            future.set_result(message)
+
+    def call(self, message, timeout, on_event=None):
+        """
+        Sends one command and waits for its result message.
+
+        Raises:
+            HomeAssistantWebSocketError: The command could not be sent
+            FutureTimeoutError: No result within timeout seconds
+        """
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise HomeAssistantWebSocketError("Home Assistant websocket is closed")
+            message_id = self.next_id
+            self.next_id += 1
+            self.pending[message_id] = future
+            if on_event is not None:
+                self.subscriptions[message_id] = on_event
+            connection = self.connection
+        try:
+            connection.send(json.dumps(dict(message, id=message_id)))
+        except Exception as e:
+            self.close(e)
+            raise HomeAssistantWebSocketError(f"Unable to send over the Home Assistant websocket: {e}") from e
+        try:
+            return future.result(timeout)
+        finally:
+            with self.lock:
+                self.pending.pop(message_id, None)
+
+    def close(self, error=None):
+        with self.lock:
+            connection, self.connection = self.connection, None
+            self.closed = True
+            pending, self.pending = self.pending, {}
+            self.subscriptions.clear()
+            self.watched.clear()
+            self.states.clear()
+        for future in pending.values():
+            future.set_exception(ConnectionError(f"Home Assistant websocket closed: {error}"))
+        if connection is not None:
+            with contextlib.suppress(Exception):
+                connection.close()
+
+    # True once every message already received from Home Assistant was handled, so the watched
+    # states include the changes pushed while the container was frozen
+    def settled(self):
+        connection = self.connection
+        if connection is None or self.dispatching:
+            return False
+        sock = connection.sock
+        if hasattr(sock, "pending") and sock.pending():
+            return False
+        readable, _, _ = select.select([sock], [], [], 0)
+        return not readable
+
+    def entity_state(self, entity_id, timeout):
+        """
+        Returns the state of an entity from memory. The first call subscribes to its changes
+        (subscribe_entities), the next ones do not need a round trip to Home Assistant.
+        """
+        with self.lock:
+            ready = self.watched.get(entity_id)
+            subscribe = ready is None
+            if subscribe:
+                ready = self.watched[entity_id] = threading.Event()
+
+        def on_event(event):
+            for changed_id, state in event.get("a", {}).items():
+                self.states[changed_id] = state.get("s")
+            for changed_id, diff in event.get("c", {}).items():
+                if "s" in diff.get("+", {}):
+                    self.states[changed_id] = diff["+"]["s"]
+            for removed_id in event.get("r", ()):
+                self.states.pop(removed_id, None)
+            ready.set()
+
+        if subscribe:
+            try:
+                result = self.call({"type": "subscribe_entities", "entity_ids": [entity_id]}, timeout, on_event=on_event)
+                if not result.get("success"):
+                    raise HomeAssistantWebSocketError(f"Subscription to {entity_id} failed: {result.get('error')}")
+            except Exception:
+                with self.lock:
+                    self.watched.pop(entity_id, None)
+                raise
+        deadline = time.monotonic() + timeout
+        if not ready.wait(timeout):
+            raise FutureTimeoutError(f"No state received for {entity_id}")
+        while not self.settled() and not self.closed and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if self.closed:
+            raise HomeAssistantWebSocketError("Home Assistant websocket is closed")
+        return self.states.get(entity_id)
+
+# Open websockets by access token, the oldest one is closed above the limit
+HA_WEBSOCKET_MAX_CONNECTIONS = 4
+ha_websockets = OrderedDict()
+ha_websockets_lock = threading.Lock()
+
+# The open websocket of this token, connected on first use
+def get_ha_websocket(token):
+    if ha_circuit.rejects_requests():
+        raise HomeAssistantWebSocketError("Home Assistant is unreachable")
+    with ha_websockets_lock:
+        connection = ha_websockets.get(token)
+        if connection is None:
+            connection = ha_websockets[token] = HomeAssistantWebSocket(token)
+            while len(ha_websockets) > HA_WEBSOCKET_MAX_CONNECTIONS:
+                ha_websockets.popitem(last=False)[1].close()
+        ha_websockets.move_to_end(token)
+    try:
+        connection.ensure_open()
+    except HomeAssistantWebSocketError:
+        raise
+    except Exception as e:
+        raise HomeAssistantWebSocketError(f"Unable to connect the Home Assistant websocket: {e}") from e
+    return connection
+
+# Sends a conversation request over the websocket
+@timed_span("ha_websocket")
+def ha_websocket_conversation(data, token, budget=None):
+    """
+    Returns:
+        The result of conversation/process, like the JSON body of the REST API, or None when the
+        websocket is not available and the request must go through REST
+    """
+    try:
+        result = get_ha_websocket(token).call(dict(data, type="conversation/process"), budget_read_timeout(budget) or home_assistant_read_timeout)
+    except HomeAssistantWebSocketError as e:
+        logger.warning(f"{e}, using REST")
+        return None
+    # Once sent, a command is never repeated over REST: Home Assistant may have executed it already
+    if result.get("success"):
+        return result.get("result")
+    return {"message": (result.get("error") or {}).get("message", "")}
+
+# States of all the entities over the websocket (get_states), or None to use REST
+@timed_span("ha_websocket")
+def ha_websocket_states(token):
+    try:
+        result = get_ha_websocket(token).call({"type": "get_states"}, home_assistant_read_timeout)
+        if result.get("success"):
+            return result.get("result")
+        logger.warning(f"HA get_states failed: {result.get('error')}, using REST")
+    except Exception as e:
+        logger.warning(f"Unable to get the states over the Home Assistant websocket: {e}, using REST")
+    return None
+
+# State of an entity kept in memory by the websocket subscription, or None to use REST
+@timed_span("ha_websocket")
+def ha_websocket_entity_state(token, entity_id, timeout):
+    try:
+        return get_ha_websocket(token).entity_state(entity_id, timeout)
+    except Exception as e:
+        logger.warning(f"Unable to read {entity_id} over the Home Assistant websocket: {e}, using REST")
+    return None
 
 # Helper: fetch text input via webhook
-def fetch_prompt_from_ha():
+@timed_span("fetch_prompt_from_ha")
+def fetch_prompt_from_ha(state):
     """
-    Reads the state of your input_text helper directly via REST API.
+    Reads the state of your input_text helper directly via REST API (or from the websocket
+    subscription), or takes it from the prefetch started by a previous request.
     """
+    future = prompt_prefetches.pop(state.account_linking_token)
+    if future is not None:
+        logger.debug("Using the prefetched HA prompt")
+        return future.result()
+    return read_prompt_state(state.account_linking_token)
+
+def read_prompt_state(token):
+    if ha_websocket_enabled:
+        prompt = ha_websocket_entity_state(token, assist_input_entity, 5)
+        if prompt is not None:
+            return prompt.strip()
     try:
-        url = f"{home_assistant_url}/api/states/{assist_input_entity}"
-        headers = {
-            "Authorization": "Bearer {}".format(account_linking_token),
-            "Content-Type": "application/json",
-        }
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = ha_request("GET", f"/api/states/{assist_input_entity}", token, read_timeout=5)
         if resp.status_code == 200:
             return resp.json().get("state", "").strip()
         else:
@@ -89,62 +950,201 @@ def fetch_prompt_from_ha():
         logger.error(f"Error fetching prompt from HA state: {e}")
     return ""
 
-def localize(handler_input):
-    # Load locale per user
-    locale = handler_input.request_envelope.request.locale
-    load_config(f"locale/{locale}.lang")
+# Prompt reads started ahead of the request that needs them, per access token, used at most once
+class PromptPrefetches:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def start(self, token):
+        """
+        Reads the prompt in the background. The same call opens the connection to Home Assistant
+        and validates the token, so the follow-up request skips the DNS/TCP/TLS setup too.
+        """
+        if self.ttl <= 0 or not token or not home_assistant_url:
+            return
+        now = time.monotonic()
+        with self.lock:
+            for key in [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]:
+                del self.entries[key]
+            if token in self.entries:
+                return
+            self.entries[token] = (now + self.ttl, executor.submit(read_prompt_state, token))
+        logger.debug("HA warm-up and prompt prefetch started")
+
+    # The prefetch of this token (a future), if it is recent enough
+    def pop(self, token):
+        with self.lock:
+            entry = self.entries.pop(token, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
 
-    # save user_locale var for regional differences in number handling like 2.4°C / 2,4°C
-    global user_locale
-    user_locale = locale.split("-")[1]  # "de-DE" -> "DE" split to respect lang differencies (not country specific)
+prompt_prefetches = PromptPrefetches(prefetch_ttl)
+
+# Conversation state of one user on one device
+class SessionState:
+    __slots__ = ("key", "conversation_id", "last_interaction_date", "is_apl_supported", "account_linking_token")
+
+    def __init__(self, key, conversation_id=None, last_interaction_date=None, is_apl_supported=False, account_linking_token=None):
+        self.key = key
+        self.conversation_id = conversation_id
+        self.last_interaction_date = last_interaction_date
+        self.is_apl_supported = is_apl_supported
+        self.account_linking_token = account_linking_token
+
+    def to_dict(self):
+        # The token comes with every request, so it is never persisted
+        return {
+            "conversation_id": self.conversation_id,
+            "last_interaction_date": self.last_interaction_date,
+            "is_apl_supported": self.is_apl_supported,
+        }
+
+# Interface of the session state backends
+class SessionStore:
+    def get(self, key):
+        """
+        Returns:
+            The SessionState of the key, or None if it doesn't exist or has expired
+        """
+        raise NotImplementedError
+
+    def put(self, state):
+        raise NotImplementedError
+
+# Bounded in-memory LRU store with expiry, lives as long as the warm container
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[1]
+            self.entries.pop(key, None)
+            return None
+
+    def put(self, state):
+        with self.lock:
+            self.entries[state.key] = (time.monotonic() + self.ttl, state)
+            self.entries.move_to_end(state.key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+# SQLite file store, e.g. on a mounted EFS to share the state between containers
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        import sqlite3
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, data TEXT, expires REAL)")
+        self.connection.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM sessions WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return SessionState(key, **json.loads(row[0])) if row else None
+
+    def put(self, state):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sessions (key, data, expires) VALUES (?, ?, ?)",
+                (state.key, json.dumps(state.to_dict()), time.time() + self.ttl),
+            )
+            self.connection.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+            self.connection.commit()
+
+def create_session_store():
+    if session_store_backend == "sqlite":
+        try:
+            return SQLiteSessionStore(session_store_path, session_store_ttl)
+        except Exception as e:
+            logger.error(f"Unable to open session store '{session_store_path}', using memory: {e}")
+    return MemorySessionStore(session_store_ttl, session_store_size)
+
+with profile_step("session store"):
+    session_store = create_session_store()
+
+# Returns the state of the user and device of the request, refreshed with the request data
+def get_session_state(handler_input):
+    system = handler_input.request_envelope.context.system
+    device_id = system.device.device_id if system.device else None
+    key = f"{system.user.user_id}:{device_id}"
+
+    state = session_store.get(key) or SessionState(key)
+    # Obtaining Account Linking token
+    state.account_linking_token = system.user.access_token
+    if state.account_linking_token is None and debug:
+        state.account_linking_token = os.environ.get('home_assistant_token') # DEBUG Purpose
+    # Checks if the device has a screen (APL support)
+    state.is_apl_supported = bool(system.device and system.device.supported_interfaces.alexa_presentation_apl is not None)
+    return state
+
+# Returns the locale of the user request
+@timed_span("localize")
+def localize(handler_input):
+    return load_locale(getattr(handler_input.request_envelope.request, "locale", None) or "en-US")
 
 class LaunchRequestHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
         return ask_utils.is_request_type("LaunchRequest")(handler_input)
 
     def handle(self, handler_input):
-        global conversation_id, last_interaction_date, is_apl_supported, account_linking_token, suppress_greeting
-        
-        localize(handler_input)
-
-        # Obtaining Account Linking token
-        account_linking_token = handler_input.request_envelope.context.system.user.access_token
-        if account_linking_token is None and debug:
-            account_linking_token = os.environ.get('home_assistant_token') # DEBUG Purpose
+        locale = localize(handler_input)
+        state = get_session_state(handler_input)
 
         # Verifying if token was successfully obtained
-        if not account_linking_token:
+        if not state.account_linking_token:
             logger.error("Unable to get token from Alexa Account Linking or AWS Functions environment variable.")
-            speak_output = globals().get("alexa_speak_error")
+            speak_output = locale.get("alexa_speak_error")
             return handler_input.response_builder.speak(speak_output).response
 
-        # Check for a pre-set prompt from HA
-        prompt = fetch_prompt_from_ha()
+        # Check for a pre-set prompt from HA in background, while the APL document and greeting are prepared
+        prompt_future = executor.submit(contextvars.copy_context().run, fetch_prompt_from_ha, state)
+
+        # If the device has a screen (APL support), loads the interface
+        logger.debug("Device: " + repr(handler_input.request_envelope.context.system.device))
+        apl_document = load_template("apl_openha.json", locale) if state.is_apl_supported else None
+
+        # Defines which welcome phrase to respond to
+        now = datetime.now(timezone(timedelta(hours=-3)))
+        current_date = now.strftime('%Y-%m-%d')
+        speak_output = locale.get("alexa_speak_next_message")
+        if state.last_interaction_date != current_date:
+            # First run of the day
+            speak_output = locale.get("alexa_speak_welcome_message")
+
+        # Waits for the prompt only within the launch budget, otherwise greets normally
+        try:
+            prompt = prompt_future.result(timeout=launch_prompt_timeout)
+        except FutureTimeoutError:
+            logger.warning(f"HA prompt fetch took more than {launch_prompt_timeout}s, skipping it")
+            prompt = ""
+
         # Only treat valid prompts that are not the literal "none"
         if prompt and prompt.lower() != "none":
             # Process this prompt as user input and keep session open for follow-up
-            response = process_conversation(prompt)
-            return handler_input.response_builder.speak(response).ask(globals().get("alexa_speak_question")).response
+            response = process_conversation(prompt, locale, state)
+            return handler_input.response_builder.speak(response).ask(locale.get("alexa_speak_question")).response
 
-        # No prompt and Checks if the device has a screen (APL support), if so, loads the interface
-        device = handler_input.request_envelope.context.system.device
-        is_apl_supported = device.supported_interfaces.alexa_presentation_apl is not None
-        logger.debug("Device: " + repr(device))
-        
         # Renders the APL document with the button to open HA (if the device has a screen)
-        if is_apl_supported:
+        if apl_document:
+            from ask_sdk_model.interfaces.alexa.presentation.apl import RenderDocumentDirective
             handler_input.response_builder.add_directive(
-                RenderDocumentDirective(token=apl_document_token, document=load_template("apl_openha.json"))
+                RenderDocumentDirective(token=apl_document_token, document=apl_document)
             )
-            
-        # Sets the last access and defines which welcome phrase to respond to
-        now = datetime.now(timezone(timedelta(hours=-3)))
-        current_date = now.strftime('%Y-%m-%d')
-        speak_output = globals().get("alexa_speak_next_message")
-        if last_interaction_date != current_date:
-            # First run of the day
-            speak_output = globals().get("alexa_speak_welcome_message")
-            last_interaction_date = current_date
+
+        # Sets the last access
+        state.last_interaction_date = current_date
+        session_store.put(state)
 
         if suppress_greeting == "true":
             return handler_input.response_builder.ask("").response
@@ -152,7 +1152,7 @@ class LaunchRequestHandler(AbstractRequestHandler):
             return handler_input.response_builder.speak(speak_output).ask(speak_output).response
 
 # Helper function to send progressive response with acknowledgment sound
-def send_acknowledgment_sound(handler_input, request):
+def send_acknowledgment_sound(handler_input, request, locale):
     """
     Sends a progressive response with an acknowledgment sound to inform the user
     that their request is being processed.
@@ -160,159 +1160,626 @@ def send_acknowledgment_sound(handler_input, request):
     Args:
         handler_input: The handler input from Alexa
         request: The request object containing request_id
+        locale: The Locale of the user request
         
     Returns:
         bool: True if sound was sent successfully, False otherwise
     """
-    if not request.request_id:
-        logger.warning("Cannot send acknowledgment sound: missing request_id")
-        return False
-        
-    processing_msg = globals().get("alexa_speak_processing")
+    processing_msg = locale.get("alexa_speak_processing")
     if not processing_msg:
         logger.warning("Cannot send acknowledgment sound: missing alexa_speak_processing")
         return False
-    
+
+    if send_progressive_response(handler_input, request, processing_msg):
+        logger.debug("Acknowledgment sound sent via progressive response")
+        return True
+    return False
+
+# Speaks while the request is still being processed, using the Progressive Response API
+def send_progressive_response(handler_input, request, speech):
+    if not request.request_id:
+        logger.warning("Cannot send progressive response: missing request_id")
+        return False
+
     try:
-        # Send progressive response with acknowledgment sound
         directive_header = Header(request_id=request.request_id)
-        speak_directive = SpeakDirective(speech=processing_msg)
+        speak_directive = SpeakDirective(speech=speech)
         directive_request = SendDirectiveRequest(
             header=directive_header, directive=speak_directive
         )
         
         directive_service_client = handler_input.service_client_factory.get_directive_service()
         directive_service_client.enqueue(directive_request)
-        logger.debug("Acknowledgment sound sent via progressive response")
         return True
     except Exception as e:
-        logger.warning(f"Failed to send acknowledgment sound: {e}")
+        logger.warning(f"Failed to send progressive response: {e}")
         return False
 
+# Seconds Alexa waits for the skill response, a later answer is dropped whatever the Lambda timeout
+ALEXA_RESPONSE_WINDOW = 8
+
+# Time left to answer one request: request_deadline, capped by Alexa's window and the remaining Lambda time
+class RequestBudget:
+    def __init__(self, handler_input):
+        limit = min(request_deadline, ALEXA_RESPONSE_WINDOW) if request_deadline > 0 else ALEXA_RESPONSE_WINDOW
+        context = handler_input.context
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            limit = min(limit, context.get_remaining_time_in_millis() / 1000)
+        # Keeps deadline_margin seconds to build and return the fallback answer
+        self.limit = max(limit - deadline_margin, 0)
+        self.deadline = time.monotonic() + self.limit
+
+    def remaining(self):
+        """
+        Returns:
+            Seconds left before the deadline
+        """
+        return max(self.deadline - time.monotonic(), 0)
+
+# Read timeout of a Home Assistant call, so the call ends with the budget instead of after home_assistant_read_timeout
+def budget_read_timeout(budget):
+    if budget is None:
+        return None
+    # Never 0, which would mean no timeout at all
+    return min(max(budget.remaining(), 0.001), home_assistant_read_timeout)
+
+# Number of requests that reached each budget stage, since the container started
+budget_stats = Counter()
+budget_stats_lock = threading.Lock()
+
+# Metrics count of each budget stage, e.g. "timed_out" -> "BudgetTimedOut"
+BUDGET_STAGE_METRICS = {
+    "acknowledged": "BudgetAcknowledged",
+    "first_sentence": "BudgetFirstSentence",
+    "completed": "BudgetCompleted",
+    "timed_out": "BudgetTimedOut",
+}
+
+def record_budget_stage(stage):
+    with budget_stats_lock:
+        budget_stats[stage] += 1
+    add_metric_count(BUDGET_STAGE_METRICS[stage])
+    logger.debug(f"Request budget stage: {stage} {dict(budget_stats)}")
+
+# Runs func in the thread pool within the budget, with on_start/on_slow running alongside it
+async def run_with_budget(func, args, budget, on_start, on_slow):
+    loop = asyncio.get_running_loop()
+    # The executor threads report their spans to the metrics of this invocation (one context copy per thread)
+    future = loop.run_in_executor(executor, contextvars.copy_context().run, func, *args)
+    if on_start:
+        loop.run_in_executor(executor, contextvars.copy_context().run, on_start)
+
+    if on_slow and acknowledgment_delay > 0:
+        remaining = budget.remaining() if budget else None
+        if remaining is None or remaining > acknowledgment_delay:
+            done, _ = await asyncio.wait({future}, timeout=acknowledgment_delay)
+            if not done:
+                loop.run_in_executor(executor, contextvars.copy_context().run, on_slow)
+    return await asyncio.wait_for(future, timeout=budget.remaining() if budget else None)
+
 # Execute the asynchronous part with asyncio
-def run_async_in_executor(func, *args):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(loop.run_in_executor(executor, func, *args))
-    finally:
-        loop.close()
+def run_async_in_executor(func, *args, budget=None, on_start=None, on_slow=None):
+    """
+    Runs func in the thread pool, bridging the sync handler to the persistent event loop.
+    Raises asyncio.TimeoutError if the budget runs out first, and the result is discarded.
+    func should also be given the budget, so its Home Assistant call ends at the deadline
+    (budget_read_timeout) instead of holding a worker and a connection.
+    """
+    return asyncio.run_coroutine_threadsafe(run_with_budget(func, args, budget, on_start, on_slow), event_loop).result()
 
 class GptQueryIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
         return ask_utils.is_intent_name("GptQueryIntent")(handler_input)
 
     def handle(self, handler_input):
-        global account_linking_token
-
         # Ensure locale is set correctly
-        localize(handler_input)
+        locale = localize(handler_input)
+        # Conversation state and account linking token of this user and device
+        state = get_session_state(handler_input)
 
         request = handler_input.request_envelope.request
         context = handler_input.request_envelope.context
         response_builder = handler_input.response_builder
 
-        # Get the account linking token
-        account_linking_token = context.system.user.access_token
-
         # Extract user query
         query = request.intent.slots["query"].value
         logger.info(f"Query received from Alexa: {query}")
 
         # Handle keyword-based logic
-        keyword_response = keywords_exec(query, handler_input)
+        keyword_response = keywords_exec(query, handler_input, locale, state)
         if keyword_response:
+            set_metric_dimension("ResponseType", "keyword")
             return keyword_response
 
         # Include device ID if needed
-        device_id = ""
+        device_id = None
         if home_assistant_room_recognition == "true":
-            device_id = f". device_id: {context.system.device.device_id}"
+            device_id = context.system.device.device_id
+
+        # Compound utterances are split into their commands, e.g. "turn off the light and close the garage"
+        commands = split_commands(query, locale) if enable_multi_command == "true" else (query,)
+
+        # While Home Assistant is unreachable, answer right away instead of waiting for a timeout
+        response = None
+        if ha_circuit.rejects_requests():
+            logger.warning("Home Assistant is unreachable, circuit breaker is open")
+            ha_circuit.count_rejected()
+            response = locale.get("alexa_speak_unreachable")
+            set_metric_dimension("ResponseType", "unreachable")
+        # Simple device commands are executed locally, skipping the conversation agent
+        elif enable_local_intents == "true" and len(commands) == 1:
+            response = local_intent_exec(query, locale, state)
+            if response is not None:
+                set_metric_dimension("ResponseType", "local_intent")
 
-        # Send acknowledgment sound if enabled (using progressive response)
-        if enable_acknowledgment_sound == "true":
-            send_acknowledgment_sound(handler_input, request)
+        if response is None:
+            first_sentence_sent = threading.Event()
 
-        # Run async call
-        full_query = query + device_id
-        response = run_async_in_executor(process_conversation, full_query)
+            def acknowledge():
+                # Not needed anymore once the answer started
+                if not first_sentence_sent.is_set() and send_acknowledgment_sound(handler_input, request, locale):
+                    record_budget_stage("acknowledged")
+
+            # Streamed answers speak their first sentence as soon as it is complete
+            def speak_first_sentence(sentence):
+                if send_progressive_response(handler_input, request, sentence):
+                    first_sentence_sent.set()
+                    record_budget_stage("first_sentence")
+                    return True
+                return False
+
+            # The time left for this request, the Home Assistant call ends with it
+            budget = RequestBudget(handler_input)
+            on_first_sentence = speak_first_sentence if enable_streaming_response == "true" else None
+            if len(commands) > 1:
+                func, args = process_commands, (commands, locale, state, device_id, budget)
+            else:
+                func, args = process_conversation, (query, locale, state, device_id, on_first_sentence, budget)
+
+            # Send acknowledgment sound if enabled (using progressive response), at the same time as the HA call,
+            # otherwise only when HA takes longer than acknowledgment_delay
+            on_start = acknowledge if enable_acknowledgment_sound == "true" else None
+            on_slow = acknowledge if enable_acknowledgment_sound != "true" else None
+
+            # Run async call, within the time left for this request
+            try:
+                response = run_async_in_executor(func, *args, budget=budget, on_start=on_start, on_slow=on_slow)
+                record_budget_stage("completed")
+            except asyncio.TimeoutError:
+                logger.error(f"HA did not answer before the request deadline ({budget.limit:.1f}s)")
+                record_budget_stage("timed_out")
+                response = locale.get("alexa_speak_timeout")
 
         logger.debug(f"Ask for further commands enabled: {ask_for_further_commands}")
         if ask_for_further_commands == "true":
-            return response_builder.speak(response).ask(globals().get("alexa_speak_question")).response
+            return response_builder.speak(response).ask(locale.get("alexa_speak_question")).response
         else:
             return response_builder.speak(response).set_should_end_session(True).response
 
 # Handles keywords to execute specific commands
-def keywords_exec(query, handler_input):
+@timed_span("keywords_exec")
+def keywords_exec(query, handler_input, locale, state):
+    match = locale.keyword_matcher.match(query)
+    if not match:
+        # If it is not a keyword or the context does not allow closing
+        return None
+    action, phrase = match
+
     # Commands to open the dashboard
-    keywords_top_open_dash = globals().get("keywords_to_open_dashboard").split(";")
-    if any(ko.strip().lower() in query.lower() for ko in keywords_top_open_dash):
+    if action == "open_dashboard":
         logger.info("Opening Home Assistant dashboard")
-        open_page(handler_input)
-        return handler_input.response_builder.speak(globals().get("alexa_speak_open_dashboard")).response
-
-    # Commands to close the skill — only if query has 3 or fewer words and matches closing keywords exactly
-    keywords_close_skill = [k.strip().lower() for k in globals().get("keywords_to_close_skill").split(";")]
-    query_words = query.lower().split()
-    if len(query_words) <= 3:
-        for kc in keywords_close_skill:
-            # Match whole word or phrase using word boundaries to avoid substrings
-            if re.search(r'\b' + re.escape(kc) + r'\b', query.lower()):
-                logger.info("Closing skill from keyword command")
-                return CancelOrStopIntentHandler().handle(handler_input)
-
-    # If it is not a keyword or the context does not allow closing
+        open_page(handler_input, state)
+        return handler_input.response_builder.speak(locale.get("alexa_speak_open_dashboard")).response
+
+    # Commands to close the skill
+    if action == "close_skill":
+        logger.info("Closing skill from keyword command")
+        return CancelOrStopIntentHandler().handle(handler_input)
+
+    # User-defined keywords calling a Home Assistant service directly, skipping the conversation API
+    keyword_action = custom_keyword_actions[phrase]
+    logger.info(f"Calling {keyword_action['service']} from keyword '{phrase}'")
+    if call_ha_service(keyword_action["service"], state.account_linking_token, keyword_action.get("data")):
+        speak_output = keyword_action.get("speech") or locale.get("alexa_speak_done")
+    else:
+        speak_output = locale.get("alexa_speak_error")
+
+    if ask_for_further_commands == "true":
+        return handler_input.response_builder.speak(speak_output).ask(locale.get("alexa_speak_question")).response
+    else:
+        return handler_input.response_builder.speak(speak_output).set_should_end_session(True).response
+
+# Calls a Home Assistant service, e.g. "light.turn_off", returning True on success
+def call_ha_service(service, token, data=None):
+    try:
+        domain, service_name = service.split(".", 1)
+        response = ha_request("POST", f"/api/services/{domain}/{service_name}", token, json_data=data or {})
+        if response.status_code == 200:
+            response_cache.clear()
+            return True
+        logger.error(f"HA service call failed: {response.status_code} {response.text}")
+    except Exception as e:
+        logger.error(f"Error calling HA service {service}: {e}")
+    return False
+
+
+# Normalizes a query to compare utterances, e.g. "What's the  temperature?" -> "what's the temperature"
+def normalize_query(query):
+    return " ".join(query.lower().split()).strip(" .!?")
+
+# Bounded LRU cache with expiry for the answers of Home Assistant
+class ResponseCache:
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                if entry:
+                    del self.entries[key]
+                self.misses += 1
+                hit = False
+        add_metric_count("ResponseCacheHits" if hit else "ResponseCacheMisses")
+        return entry[1] if hit else None
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+response_cache = ResponseCache(response_cache_ttl, response_cache_size)
+
+# Single-flight of the conversation requests: identical requests share one call and its answer
+class RequestCoalescer:
+    def __init__(self, window, max_size):
+        self.window = window
+        self.max_size = max_size
+        # key -> (expires_at, future), expires_at is None while the call is in flight
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.coalesced = 0
+        self.replayed = 0
+        self.bypassed = 0
+
+    def run(self, key, call, replay=None):
+        """
+        Returns the answer of call(), or of the identical call in flight or finished less than
+        window seconds ago, so a retried command is not executed twice.
+
+        Args:
+            key: Identity of the request. process_conversation uses (account token, normalized
+                query, locale, agent id, device id):
+                - the account token, so two accounts never share an answer;
+                - the query normalized for case, spacing and end punctuation, so the
+                  transcriptions of one utterance by two devices collide;
+                - the locale and the agent, as they change the answer;
+                - the device id, only set with room recognition, where the device picks the area.
+                The conversation_id is left out on purpose: each device has its own session, so
+                the duplicates of two devices would never collide.
+            call: Sends the request, called only if no identical request is shared
+            replay: Tells whether a result may be replayed during the window. A rejected result,
+                e.g. a timeout, is only given to the calls that were waiting for it, so a retry
+                sends the request again
+        """
+        if self.window <= 0:
+            return call()
+        now = time.monotonic()
+        with self.lock:
+            for expired in [k for k, (expires_at, _) in self.entries.items() if expires_at is not None and expires_at <= now]:
+                del self.entries[expired]
+            entry = self.entries.get(key)
+            if entry is None:
+                if not self.evict():
+                    # The table is full of calls in flight: this one is not shared
+                    self.bypassed += 1
+                    future = None
+                else:
+                    future = Future()
+                    self.entries[key] = (None, future)
+            elif entry[0] is None:
+                self.coalesced += 1
+            else:
+                self.replayed += 1
+        if entry is not None:
+            metric = "CoalescedCalls" if entry[0] is None else "ReplayedCalls"
+            logger.debug(f"Request coalesced ({metric}): {key[1:]}")
+            add_metric_count(metric)
+            return entry[1].result()
+        if future is None:
+            return call()
+
+        try:
+            result = call()
+        except BaseException as e:
+            with self.lock:
+                self.entries.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self.lock:
+            if replay is None or replay(result):
+                self.entries[key] = (time.monotonic() + self.window, future)
+            else:
+                self.entries.pop(key, None)
+        future.set_result(result)
+        return result
+
+    # Makes room for one more key, dropping the oldest finished calls. False if all are in flight
+    def evict(self):
+        if len(self.entries) < self.max_size:
+            return True
+        for key, (expires_at, _) in list(self.entries.items()):
+            if expires_at is not None:
+                del self.entries[key]
+                if len(self.entries) < self.max_size:
+                    return True
+        return False
+
+    def stats(self):
+        return {"coalesced": self.coalesced, "replayed": self.replayed, "bypassed": self.bypassed, "size": len(self.entries)}
+
+request_coalescer = RequestCoalescer(request_coalescing_window, request_coalescing_size)
+
+# Domains that can be switched with the on/off/toggle local intents
+LOCAL_INTENT_SWITCH_DOMAINS = {"light", "switch", "fan", "input_boolean", "siren", "humidifier"}
+# Service and data attribute used by the "set {name} to {value}" local intent, per domain
+LOCAL_INTENT_SET_SERVICES = {
+    "light": ("turn_on", "brightness_pct"),
+    "cover": ("set_cover_position", "position"),
+    "fan": ("set_percentage", "percentage"),
+    "climate": ("set_temperature", "temperature"),
+    "input_number": ("set_value", "value"),
+    "number": ("set_value", "value"),
+    "media_player": ("volume_set", "volume_level"),
+}
+
+# In-memory index of Home Assistant entity names, synced periodically via REST
+class EntityIndex:
+    # Renders the entities of each area, as the area registry is not exposed by the REST API
+    AREAS_TEMPLATE = (
+        "{% set ns = namespace(areas=[]) %}{% for area in areas() %}"
+        "{% set ns.areas = ns.areas + [[area_name(area), area_entities(area)]] %}"
+        "{% endfor %}{{ ns.areas | tojson }}"
+    )
+    # Seconds before a failed sync is tried again (e.g. HA down or an expired token), instead of on every request
+    RETRY_INTERVAL = 30
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self.names = {}
+        self.next_sync_at = 0
+        self.syncing = False
+        self.lock = threading.Lock()
+
+    def ensure_fresh(self, token):
+        """
+        Starts a background sync when the index is stale. Never blocks the request:
+        until the first sync finishes, lookups miss and queries go to the conversation API.
+        """
+        with self.lock:
+            if self.syncing or time.monotonic() < self.next_sync_at:
+                return
+            self.syncing = True
+        executor.submit(self.sync, token)
+
+    def sync(self, token):
+        synced = False
+        try:
+            entities = ha_websocket_states(token) if ha_websocket_enabled else None
+            if entities is None:
+                response = ha_request("GET", "/api/states", token)
+                if response.status_code != 200:
+                    logger.error(f"HA entity sync failed: {response.status_code} {response.text}")
+                    return
+                entities = response.json()
+            names = {}
+            friendly_names = {}
+            for entity in entities:
+                name = str(entity.get("attributes", {}).get("friendly_name", "")).strip().lower()
+                if name:
+                    friendly_names[entity["entity_id"]] = name
+                    names.setdefault(name, set()).add(entity["entity_id"])
+
+            # Also index "<area> <name>", e.g. "kitchen ceiling" for the "Ceiling" light of the kitchen
+            response = ha_request("POST", "/api/template", token, json_data={"template": self.AREAS_TEMPLATE})
+            if response.status_code == 200:
+                for area_name, entity_ids in json.loads(response.text):
+                    area_name = str(area_name).strip().lower()
+                    for entity_id in entity_ids:
+                        name = friendly_names.get(entity_id)
+                        if name and not name.startswith(area_name):
+                            names.setdefault(f"{area_name} {name}", set()).add(entity_id)
+
+            self.names = {name: tuple(sorted(ids)) for name, ids in names.items()}
+            synced = True
+            logger.debug(f"HA entity index synced: {len(self.names)} names")
+        except Exception as e:
+            logger.error(f"Error syncing HA entity index: {e}")
+        finally:
+            # The names of the last successful sync are kept until the next one
+            self.next_sync_at = time.monotonic() + (self.sync_interval if synced else min(self.RETRY_INTERVAL, self.sync_interval))
+            self.syncing = False
+
+    def lookup(self, name):
+        """
+        Returns:
+            The entity_id matching the name, or None when there is no match or it is ambiguous
+        """
+        entity_ids = self.names.get(name)
+        return entity_ids[0] if entity_ids and len(entity_ids) == 1 else None
+
+entity_index = EntityIndex(local_intents_sync_interval)
+
+# Executes simple on/off/toggle/set commands directly via the HA services API
+def local_intent_exec(query, locale, state):
+    """
+    Matches the query against the locale phrase templates and the entity index.
+
+    Returns:
+        The speech to respond, or None when the command can't be matched confidently
+        and must go through the conversation API
+    """
+    entity_index.ensure_fresh(state.account_linking_token)
+    text = query.lower().strip(" .!?")
+    for service, pattern in locale.local_intents:
+        m = pattern.fullmatch(text)
+        if not m:
+            continue
+        entity_id = entity_index.lookup(strip_article(m.group("name"), locale))
+        if not entity_id:
+            continue
+
+        domain = entity_id.split(".", 1)[0]
+        data = {"entity_id": entity_id}
+        if service == "set":
+            if domain not in LOCAL_INTENT_SET_SERVICES:
+                continue
+            service, attribute = LOCAL_INTENT_SET_SERVICES[domain]
+            value = float(m.group("value").replace(",", "."))
+            value = int(value) if value.is_integer() else value
+            data[attribute] = value / 100 if domain == "media_player" else value
+        elif domain not in LOCAL_INTENT_SWITCH_DOMAINS:
+            continue
+
+        logger.info(f"Local intent: {domain}.{service} {data}")
+        if call_ha_service(f"{domain}.{service}", state.account_linking_token, data):
+            return locale.get("alexa_speak_done")
+        return None
     return None
 
+# Removes a leading article from an entity name, e.g. "the kitchen light" -> "kitchen light"
+def strip_article(name, locale):
+    name = name.strip()
+    for article in locale.articles:
+        if article.endswith("'") and name.startswith(article):
+            return name[len(article):].strip()
+        if name.startswith(article + " "):
+            return name[len(article) + 1:].strip()
+    return name
 
 # Calls the Home Assistant API and handles the response
-def process_conversation(query):
-    global conversation_id
-    
+@timed_span("process_conversation")
+def process_conversation(query, locale, state, device_id=None, on_first_sentence=None, budget=None):
     # Gets user-configured environment variables
     if not home_assistant_url:
         logger.error("Please set 'home_assistant_url' AWS Lambda Functions environment variable.")
-        return globals().get("alexa_speak_error")
+        return locale.get("alexa_speak_error")
     
     home_assistant_agent_id = os.environ.get("home_assistant_agent_id", None)
+
+    # Recent answers of the account to the same question on the same device are served from cache
+    normalized_query = normalize_query(query)
+    cache_key = (state.account_linking_token, normalized_query, locale.name, home_assistant_agent_id, device_id)
+    # Follow-ups like "and the kitchen?" depend on the conversation, they are never cached
+    follow_up = locale.follow_up_pattern is not None and locale.follow_up_pattern.match(normalized_query)
+    cached_speech = None if follow_up else response_cache.get(cache_key)
+    if cached_speech is not None:
+        logger.debug(f"Response cache hit: {cache_key}")
+        set_metric_dimension("CacheHit", True)
+        return cached_speech
+
+    # Records the first sentence spoken by this caller, a coalesced caller gets the whole answer
+    spoken = []
+    def speak_first_sentence(sentence):
+        if on_first_sentence(sentence):
+            spoken.append(sentence)
+            return True
+        return False
+
+    # A retry after a failed call (e.g. after the timeout answer) asks Home Assistant again
+    failed_answers = (locale.get("alexa_speak_timeout"), locale.get("alexa_speak_unreachable"), locale.get("alexa_speak_error"))
+    # Identical requests of one account (an Alexa retry, or two Echo devices waking on the same
+    # utterance) share one Home Assistant call, its answer and its conversation
+    speech, conversation_id = request_coalescer.run(
+        cache_key,
+        lambda: (send_conversation(query, locale, state, device_id, speak_first_sentence if on_first_sentence else None, None if follow_up else cache_key, budget), state.conversation_id),
+        replay=lambda result: result[0] not in failed_answers,
+    )
+    if conversation_id != state.conversation_id:
+        # A coalesced caller continues the conversation of the call it shared
+        state.conversation_id = conversation_id
+        session_store.put(state)
+
+    # The first sentence was already spoken as a progressive response
+    if spoken and speech.startswith(spoken[0]):
+        speech = speech[len(spoken[0]):].lstrip(" .,")
+    return speech
+
+# Sends one conversation request to Home Assistant and turns its result into the speech
+def send_conversation(query, locale, state, device_id, on_first_sentence, cache_key, budget=None):
+    home_assistant_agent_id = os.environ.get("home_assistant_agent_id", None)
     home_assistant_language = os.environ.get("home_assistant_language", None)
-        
+
     try:
-        headers = {
-            "Authorization": "Bearer {}".format(account_linking_token),
-            "Content-Type": "application/json",
-        }
         data = {
-            "text": replace_words(query)
+            "text": replace_words(query + (f". device_id: {device_id}" if device_id else ""))
         }
         # Adding optional parameters to request
         if home_assistant_language:
             data["language"] = home_assistant_language
         if home_assistant_agent_id:
             data["agent_id"] = home_assistant_agent_id
-        if conversation_id:
-            data["conversation_id"] = conversation_id
+        if state.conversation_id:
+            data["conversation_id"] = state.conversation_id
 
         ha_api_url = "{}/api/conversation/process".format(home_assistant_url)
         logger.debug(f"HA request url: {ha_api_url}")        
         logger.debug(f"HA request data: {data}")
         
-        response = requests.post(ha_api_url, headers=headers, json=data)
-        
-        logger.debug(f"HA response status: {response.status_code}")
-        logger.debug(f"HA response data: {response.text}")
+        # With streaming, the first sentence is spoken before the rest of the answer arrives
+        streaming = enable_streaming_response == "true" and on_first_sentence
+        response = None
+        response_data = None
+        if ha_websocket_enabled and not streaming:
+            response_data = ha_websocket_conversation(data, state.account_linking_token, budget)
+        if response_data is not None:
+            status_code = 200
+            contenttype = "application/json"
+        else:
+            if streaming:
+                response, response_data, _ = stream_conversation(data, state.account_linking_token, locale, on_first_sentence, budget)
+            else:
+                response = ha_request("POST", "/api/conversation/process", state.account_linking_token, json_data=data, read_timeout=budget_read_timeout(budget))
+            status_code = response.status_code
+            contenttype = response.headers.get('Content-Type', '')
         
-        contenttype = response.headers.get('Content-Type', '')
+        logger.debug(f"HA response status: {status_code}")
+        logger.debug(f"HA response data: {response_data if response_data is not None else response.text}")
         logger.debug(f"Content-Type: {contenttype}")
         
-        if (contenttype == "application/json"):
-            response_data = response.json()
+        if response_data is not None or (contenttype == "application/json"):
+            if response_data is None:
+                response_data = response.json()
             speech = None
+            response_type = None
 
-            if response.status_code == 200 and "response" in response_data:
-                conversation_id = response_data.get("conversation_id", conversation_id)
+            if status_code == 200 and "response" in response_data:
+                state.conversation_id = response_data.get("conversation_id", state.conversation_id)
+                session_store.put(state)
                 response_type = response_data["response"]["response_type"]
+                set_metric_dimension("ResponseType", response_type)
                 
                 if response_type == "action_done" or response_type == "query_answer":
                     # Extract speech, preferring SSML over plain text
@@ -325,25 +1792,32 @@ def process_conversation(query):
                     speech, is_ssml = extract_speech(response_data["response"]["speech"])
                     logger.error(f"Error code: {response_data['response']['data']['code']}")
                 else:
-                    speech = globals().get("alexa_speak_error")
+                    speech = locale.get("alexa_speak_error")
                     is_ssml = False
 
             if not speech:
                 if "message" in response_data:
                     message = response_data["message"]
                     logger.error(f"Empty speech: {message}")
-                    return improve_response(f"{globals().get('alexa_speak_error')} {message}")
+                    return improve_response(f"{locale.get('alexa_speak_error')} {message}", locale)
                 else:
                     logger.error(f"Empty speech: {response_data}")
-                    return globals().get("alexa_speak_error")
+                    return locale.get("alexa_speak_error")
 
             # If speech is SSML, return as-is; otherwise apply text improvements
             if is_ssml:
                 logger.debug("Returning SSML response")
-                return speech
             else:
                 logger.debug("Returning plain text response with improvements")
-                return improve_response(speech)
+                speech = improve_response(speech, locale)
+
+            # Only answers are cached, an executed action may have changed what they say
+            if response_type == "query_answer":
+                if cache_key:
+                    response_cache.put(cache_key, speech)
+            elif response_type == "action_done":
+                response_cache.clear()
+            return speech
         elif (contenttype == "text/html") and int(response.status_code, 0) >= 400:
             errorMatch = re.search(r'<title>(.*?)</title>', response.text, re.IGNORECASE)
             
@@ -353,21 +1827,149 @@ def process_conversation(query):
             else:
                 logger.error(f"HTTP error {response.status_code}: Unable to connect to your Home Assistant server. \n {response.text}")
                 
-            return globals().get("alexa_speak_error")
+            return locale.get("alexa_speak_error")
         elif  (contenttype == "text/plain") and int(response.status_code, 0) >= 400:
             logger.error(f"Error processing request: {response.text}")
-            return globals().get("alexa_speak_error")
+            return locale.get("alexa_speak_error")
         else:
             logger.error(f"Error processing request: {response.text}")
-            return globals().get("alexa_speak_error")
+            return locale.get("alexa_speak_error")
             
-    except requests.exceptions.Timeout as te:
+    except HomeAssistantUnreachableError as ue:
+        logger.warning(str(ue))
+        return locale.get("alexa_speak_unreachable")
+
+    except ha_timeout_errors as te:
         logger.error(f"Timeout when communicating with Home Assistant: {str(te)}", exc_info=True)
-        return globals().get("alexa_speak_timeout")
+        return locale.get("alexa_speak_timeout")
 
     except Exception as e:
         logger.error(f"Error processing response: {str(e)}", exc_info=True)
-        return globals().get("alexa_speak_error")
+        return locale.get("alexa_speak_error")
+
+# Words of the shortest command split from an utterance: "the black and white lamp" is not split
+MULTI_COMMAND_MIN_WORDS = 3
+
+# Commands of a compound utterance, split on the conjunctions of the locale
+def split_commands(query, locale):
+    if not locale.command_splitter:
+        return (query,)
+    commands = tuple(command.strip(" ,.") for command in locale.command_splitter.split(query))
+    if len(commands) > 1 and all(len(command.split()) >= MULTI_COMMAND_MIN_WORDS for command in commands):
+        logger.debug(f"Query split into {len(commands)} commands: {commands}")
+        return commands
+    return (query,)
+
+# Runs the commands of one utterance at the same time, the answers are spoken in the order of the commands
+def process_commands(commands, locale, state, device_id=None, budget=None):
+    def process_command(command):
+        response = local_intent_exec(command, locale, state) if enable_local_intents == "true" else None
+        if response is None:
+            response = process_conversation(command, locale, state, device_id, budget=budget)
+        return response
+
+    futures = [executor.submit(contextvars.copy_context().run, process_command, command) for command in commands[1:]]
+    # The first command runs in this thread, so a full pool can not leave the utterance waiting
+    responses = [process_command(commands[0])] + [future.result() for future in futures]
+    return " ".join(join_speech(response) for response in responses if response)
+
+SPEAK_TAG_PATTERN = re.compile(r"^\s*<speak>|</speak>\s*$")
+
+# One answer of a compound utterance, without its own <speak> tag and ending like a sentence
+def join_speech(speech):
+    speech = SPEAK_TAG_PATTERN.sub("", speech).strip()
+    return speech if speech.endswith((".", "!", "?", ">")) else f"{speech}."
+
+# Complete first sentence of a streamed answer, once more text follows it (so "21.5" is not cut)
+FIRST_SENTENCE_PATTERN = re.compile(r"\s*(.+?[.!?])\s+(?=\S)", re.DOTALL)
+
+# Reads a streamed conversation answer, speaking its first sentence as soon as it is complete
+def stream_conversation(data, token, locale, on_first_sentence, budget=None):
+    """
+    Sends the conversation request and consumes the answer as it arrives, when Home Assistant
+    (or a proxy in front of it) streams it as server-sent events or NDJSON.
+
+    Args:
+        data: Conversation request data
+        token: Home Assistant access token
+        locale: The Locale of the user request
+        on_first_sentence: Called with the first sentence, returns True if it was spoken
+        budget: RequestBudget of the request, reading stops at its deadline
+
+    Returns:
+        Tuple of (response, response_data, spoken): response_data is None if the answer was not
+        streamed, spoken is the sentence already spoken to the user
+    """
+    with ha_stream("POST", "/api/conversation/process", token, json_data=data, read_timeout=budget_read_timeout(budget)) as response:
+        contenttype = response.headers.get('Content-Type', '').split(';')[0].strip()
+        if response.status_code != 200 or contenttype not in HA_STREAM_CONTENT_TYPES:
+            read_response_body(response)
+            return response, None, ""
+
+        text = ""
+        result = None
+        first_sentence = None
+        for line in iter_response_lines(response):
+            # The read timeout applies to each chunk, a stream that keeps trickling is cut at the deadline
+            if budget is not None and budget.remaining() <= 0:
+                raise requests.exceptions.ReadTimeout("Request deadline reached while reading the streamed answer")
+            delta, event_result = parse_stream_event(line)
+            if event_result is not None:
+                result = event_result
+            elif delta:
+                text += delta
+                if first_sentence is None:
+                    match = FIRST_SENTENCE_PATTERN.match(text)
+                    if match:
+                        sentence = improve_response(match.group(1), locale)
+                        # Speaking it is an HTTP call to Alexa: it runs in the default executor of the
+                        # event loop (not in the pool reading this stream), while the stream is read on
+                        first_sentence = (sentence, asyncio.run_coroutine_threadsafe(asyncio.to_thread(contextvars.copy_context().run, on_first_sentence, sentence), event_loop))
+
+    spoken = ""
+    if first_sentence is not None and first_sentence[1].result():
+        spoken = first_sentence[0]
+        logger.debug(f"First sentence spoken: {spoken}")
+
+    if result is None:
+        # Only text deltas were streamed. The answer may come from an executed action, so it is
+        # handled as action_done and never cached
+        result = {
+            "response": {"response_type": "action_done", "speech": {"plain": {"speech": text}}},
+            "conversation_id": data.get("conversation_id"),
+        }
+    return response, result, spoken
+
+# Text delta or final result of one streamed event: an SSE "data:" line or an NDJSON line
+def parse_stream_event(line):
+    """
+    Understands the events of the Assist pipeline (intent-progress with chat_log_delta and
+    intent-end), plain {"delta"|"content": text} chunks and a final conversation result.
+
+    Returns:
+        Tuple of (delta, result), both None for lines without content
+    """
+    line = line.strip()
+    if line.startswith("data:"):
+        line = line[5:].strip()
+    if not line.startswith("{"):
+        # Blank separators, SSE comments/fields and "[DONE]"
+        return None, None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        logger.debug(f"Invalid stream event: {line}")
+        return None, None
+
+    event_data = event.get("data") if isinstance(event.get("data"), dict) else event
+    if isinstance(event_data.get("intent_output"), dict):
+        return None, event_data["intent_output"]
+    if "response" in event_data:
+        return None, event_data
+
+    delta = event_data.get("chat_log_delta", event_data)
+    content = delta.get("content", delta.get("delta")) if isinstance(delta, dict) else None
+    return (content if isinstance(content, str) else None), None
 
 # Extract speech from Home Assistant response, preferring SSML over plain text
 def extract_speech(speech_data):
@@ -401,35 +2003,65 @@ def replace_words(query):
     return query
 
 # Replaces words and special characters to improve API response speech
-def improve_response(speech):
-    global user_locale
+@timed_span("improve_response")
+def improve_response(speech, locale):
     speech = speech.replace(':\n\n', '').replace('\n\n', '. ').replace('\n', ',').replace('-', '').replace('_', ' ')
 
-    # Change decimal separator if user_locale = "de-DE"
-    if user_locale == "DE":
+    # Change decimal separator if the locale uses decimal comma (decimal_separator in the language file)
+    if locale.decimal_comma:
         # Only replace decimal separators and not 1.000 separators
         speech = re.sub(r'(\d+)\.(\d{1,3})(?!\d)', r'\1,\2', speech)  # Decimal point (e.g. 2.4 -> 2,4)
     
     speech = re.sub(r'[^A-Za-z0-9çÇáàâãäéèêíïóôõöúüñÁÀÂÃÄÉÈÊÍÏÓÔÕÖÚÜÑ\sß.,!?°]', '', speech)
     return speech
 
-# Loads the initial APL screen template
-def load_template(filepath):
+# Dynamic values of each APL template: path inside the document -> locale text, or the dashboard URL
+APL_BINDINGS = {
+    "apl_openha.json": {
+        ("mainTemplate", "items", 0, "items", 2, "text"): "echo_screen_welcome_text",
+        ("mainTemplate", "items", 0, "items", 3, "text"): "echo_screen_click_text",
+        ("mainTemplate", "items", 0, "items", 4, "onPress", "source"): "dashboard_url",
+        ("mainTemplate", "items", 0, "items", 4, "item", "text"): "echo_screen_button_text",
+    },
+}
+
+# Reads an APL template once per container, from the bundle or its file
+@functools.lru_cache(maxsize=None)
+def read_template(filepath):
+    bundle = load_bundle()
+    if bundle is not None and filepath in bundle["templates"]:
+        return bundle["templates"][filepath]
     with open(filepath, encoding='utf-8') as f:
-        template = json.load(f)
+        return json.load(f)
 
-    if filepath == 'apl_openha.json':
-        # Locate dynamic texts in the APL
-        template['mainTemplate']['items'][0]['items'][2]['text'] = globals().get("echo_screen_welcome_text")
-        template['mainTemplate']['items'][0]['items'][3]['text'] = globals().get("echo_screen_click_text")
-        template['mainTemplate']['items'][0]['items'][4]['onPress']['source'] = get_hadash_url()
-        template['mainTemplate']['items'][0]['items'][4]['item']['text'] = globals().get("echo_screen_button_text")
+# Renders a template with its bindings to JSON text, cached per (template, locale, dashboard URL, kiosk mode)
+@functools.lru_cache(maxsize=template_cache_size)
+def render_template(filepath, locale_name, dashboard_url, kioskmode):
+    template = copy.deepcopy(read_template(filepath))
+    locale = load_locale(locale_name) if locale_name else None
+    for path, source in APL_BINDINGS.get(filepath, {}).items():
+        value = dashboard_url if source == "dashboard_url" else locale.get(source)
+        node = template
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = value
+    return json.dumps(template)
 
-    return template
+# Loads the initial APL screen template
+@timed_span("load_template")
+def load_template(filepath, locale=None):
+    """
+    Returns:
+        A new document parsed from the cached JSON text, the handlers can change it without
+        touching the cache (json.loads is faster than a deepcopy of the cached document)
+    """
+    return json.loads(render_template(filepath, locale.name if locale else None, get_hadash_url(), home_assistant_kioskmode))
 
 # Opens Home Assistant dashboard in Silk browser
-def open_page(handler_input):
-    if is_apl_supported:
+def open_page(handler_input, state):
+    if state.is_apl_supported:
+        from ask_sdk_model.interfaces.alexa.presentation.apl import RenderDocumentDirective, ExecuteCommandsDirective, OpenUrlCommand
+
         # Renders an empty template, required for the OpenURL command
         # https://amazon.developer.forums.answerhub.com/questions/220506/alexa-open-a-browser.html
         
@@ -465,7 +2097,7 @@ class HelpIntentHandler(AbstractRequestHandler):
         return ask_utils.is_intent_name("AMAZON.HelpIntent")(handler_input)
 
     def handle(self, handler_input):
-        speak_output = globals().get("alexa_speak_help")
+        speak_output = localize(handler_input).get("alexa_speak_help")
         return handler_input.response_builder.speak(speak_output).ask(speak_output).response
 
 class CancelOrStopIntentHandler(AbstractRequestHandler):
@@ -473,7 +2105,7 @@ class CancelOrStopIntentHandler(AbstractRequestHandler):
         return ask_utils.is_intent_name("AMAZON.CancelIntent")(handler_input) or ask_utils.is_intent_name("AMAZON.StopIntent")(handler_input)
 
     def handle(self, handler_input):
-        speak_output = random.choice(globals().get("alexa_speak_exit").split(";"))
+        speak_output = random.choice(localize(handler_input).exit_phrases)
         return handler_input.response_builder.speak(speak_output).set_should_end_session(True).response
 
 class SessionEndedRequestHandler(AbstractRequestHandler):
@@ -488,7 +2120,10 @@ class CanFulfillIntentRequestHandler(AbstractRequestHandler):
         return ask_utils.is_request_type("CanFulfillIntentRequest")(handler_input)
 
     def handle(self, handler_input):
+        # Loads the user locale ahead of the follow-up request
         localize(handler_input)
+        # Warms up Home Assistant in the background, the user is about to talk to it
+        prompt_prefetches.start(get_session_state(handler_input).account_linking_token)
         
         intent_name = handler_input.request_envelope.request.intent.name if handler_input.request_envelope.request.intent else None
         if intent_name == "GptQueryIntent":
@@ -502,15 +2137,47 @@ class CatchAllExceptionHandler(AbstractExceptionHandler):
 
     def handle(self, handler_input, exception):
         logger.error(exception, exc_info=True)
-        speak_output = globals().get("alexa_speak_error")
+        speak_output = localize(handler_input).get("alexa_speak_error")
         return handler_input.response_builder.speak(speak_output).ask(speak_output).response
 
-sb = CustomSkillBuilder(api_client=DefaultApiClient())
-sb.add_request_handler(LaunchRequestHandler())
-sb.add_request_handler(GptQueryIntentHandler())
-sb.add_request_handler(HelpIntentHandler())
-sb.add_request_handler(CancelOrStopIntentHandler())
-sb.add_request_handler(SessionEndedRequestHandler())
-sb.add_request_handler(CanFulfillIntentRequestHandler())
-sb.add_exception_handler(CatchAllExceptionHandler())
-lambda_handler = sb.lambda_handler()
\ No newline at end of file
+with profile_step("skill builder"):
+    sb = CustomSkillBuilder(api_client=DefaultApiClient())
+    sb.add_request_handler(LaunchRequestHandler())
+    sb.add_request_handler(GptQueryIntentHandler())
+    sb.add_request_handler(HelpIntentHandler())
+    sb.add_request_handler(CancelOrStopIntentHandler())
+    sb.add_request_handler(SessionEndedRequestHandler())
+    sb.add_request_handler(CanFulfillIntentRequestHandler())
+    sb.add_exception_handler(CatchAllExceptionHandler())
+    skill_lambda_handler = sb.lambda_handler()
+
+# Number of invocations handled by this container, the first one is the cold start
+invocation_count = 0
+
+def lambda_handler(event, context):
+    global invocation_count
+    invocation_count += 1
+    if enable_metrics != "true" and not metrics_file:
+        return skill_lambda_handler(event, context)
+
+    record = InvocationMetrics(cold_start=invocation_count == 1)
+    request = event.get("request", {}) if isinstance(event, dict) else {}
+    record.properties = {
+        "RequestType": request.get("type", ""),
+        "IntentName": request.get("intent", {}).get("name", ""),
+        "Locale": request.get("locale", ""),
+        "RequestId": request.get("requestId", ""),
+        "CircuitBreakerState": ha_circuit.state,
+    }
+    token = current_metrics.set(record)
+    start = time.perf_counter()
+    try:
+        return skill_lambda_handler(event, context)
+    finally:
+        record.add_span("total", (time.perf_counter() - start) * 1000)
+        current_metrics.reset(token)
+        emit_metrics(record)
+
+startup_timings["total"] = round((time.perf_counter() - startup_started) * 1000, 2)
+if startup_profile == "true":
+    logger.info(f"Startup profile (ms): {json.dumps(startup_timings)}")
\ No newline at end of file
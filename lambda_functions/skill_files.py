@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Formats of the skill files, shared by lambda_function.py and build_bundle.py. Importing this
+module has no side effects, unlike lambda_function.py (HTTP client, event loop, locales).
+"""
+
+BUNDLE_FILE = "bundle.json"
+
+# Parses a .lang file into a dict of texts
+def load_lang_file(file_name):
+    texts = {}
+    with open(file_name, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or '=' not in line:
+                continue
+            name, value = line.split('=', 1)
+            texts[name] = value
+    return texts
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup of the tests: imports lambda_function the way AWS Lambda does and gives each test a
+fresh local stub of Home Assistant (benchmark/fake_ha.py). Run from the repository root:
+
+    pip install -r lambda_functions/requirements.txt pytest websocket-client
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmark")
+if BENCHMARK_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARK_DIR)
+
+# The optional transports are imported once, each test enables the ones it covers
+os.environ.setdefault("home_assistant_transport", "websocket")
+os.environ.setdefault("home_assistant_prewarm", "false")
+os.environ.setdefault("home_assistant_url", "http://127.0.0.1:9")
+
+from common import import_lambda_function, alexa_envelope, LambdaContext  # noqa: E402
+from fake_ha import start_fake_ha, set_state, drop_websockets  # noqa: E402
+
+lf = import_lambda_function()
+
+class HomeAssistantTestCase(unittest.TestCase):
+    """Starts a stub of Home Assistant per test, and resets the state shared by the requests"""
+
+    TOKEN = "test-token"
+    # Options of start_fake_ha
+    FAKE_HA = {}
+
+    def setUp(self):
+        self.server, url = start_fake_ha(**{"chunk_delay": 0, **self.FAKE_HA})
+        self.addCleanup(self.server.shutdown)
+        self.patch(lf, "home_assistant_url", url)
+        self.patch(lf, "ha_websocket_enabled", False)
+        self.patch(lf, "enable_streaming_response", "false")
+        self.patch(lf, "ha_circuit", lf.CircuitBreaker(lf.circuit_breaker_failure_rate, lf.circuit_breaker_min_calls, lf.circuit_breaker_window, lf.circuit_breaker_cooldown))
+        self.patch(lf, "ha_websockets", lf.OrderedDict())
+        self.addCleanup(self.close_websockets)
+        lf.response_cache.clear()
+        self.locale = lf.load_locale("en-US")
+
+    # Sets a module attribute for the duration of the test
+    def patch(self, target, name, value):
+        original = getattr(target, name)
+        setattr(target, name, value)
+        self.addCleanup(setattr, target, name, original)
+
+    def close_websockets(self):
+        for connection in list(lf.ha_websockets.values()):
+            connection.close()
+
+    def new_state(self, key="test"):
+        state = lf.SessionState(key)
+        state.account_linking_token = self.TOKEN
+        return state
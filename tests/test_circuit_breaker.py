@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Circuit breaker of the Home Assistant calls, with Home Assistant down
+import socket
+import unittest
+
+from support import lf, HomeAssistantTestCase, alexa_envelope, LambdaContext
+
+class CircuitBreakerTest(HomeAssistantTestCase):
+    def setUp(self):
+        super().setUp()
+        # A port nothing listens on: every connection is refused
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.patch(lf, "home_assistant_url", f"http://127.0.0.1:{port}")
+        self.patch(lf, "ha_circuit", lf.CircuitBreaker(0.5, 3, 60, 30))
+        self.record = lf.InvocationMetrics(cold_start=False)
+        token = lf.current_metrics.set(self.record)
+        self.addCleanup(lf.current_metrics.reset, token)
+
+    def ask(self, query):
+        return lf.process_conversation(query, self.locale, self.new_state())
+
+    def test_opening_is_logged_and_counted(self):
+        with self.assertLogs(lf.logger, "WARNING") as logs:
+            for index in range(3):
+                self.ask(f"question {index}")
+        self.assertTrue(any("3 of the last 3 calls failed" in line for line in logs.output))
+        self.assertTrue(any("Circuit breaker open: Alexa answers alexa_speak_unreachable" in line for line in logs.output))
+        self.assertEqual(lf.ha_circuit.stats(), {"state": "open", "calls": 0, "opened": 1, "rejected": 0})
+        self.assertEqual(self.record.counts["CircuitBreakerOpened"], 1)
+
+        self.assertEqual(self.ask("question 4"), self.locale.get("alexa_speak_unreachable"))
+        self.assertEqual(lf.ha_circuit.stats()["rejected"], 1)
+        self.assertEqual(self.record.counts["CircuitBreakerRejected"], 1)
+
+    def test_rejected_utterance_is_counted_in_the_invocation_metrics(self):
+        for index in range(3):
+            self.ask(f"question {index}")
+        emitted = []
+        self.patch(lf, "enable_metrics", "true")
+        self.patch(lf, "emit_metrics", emitted.append)
+        lf.lambda_handler(alexa_envelope("GptQueryIntent", "en-US", query="turn on the kitchen light"), LambdaContext())
+
+        self.assertEqual(emitted[0].counts, {"CircuitBreakerRejected": 1})
+        self.assertEqual(emitted[0].properties["CircuitBreakerState"], "open")
+        self.assertEqual(emitted[0].dimensions["ResponseType"], "unreachable")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Entity names of the local intents (enable_local_intents), synced from Home Assistant
+import time
+import unittest
+
+from support import lf, HomeAssistantTestCase
+
+class EntityIndexTest(HomeAssistantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = lf.EntityIndex(300)
+
+    def test_sync_is_not_repeated_before_the_interval(self):
+        self.index.sync(self.TOKEN)
+        self.assertEqual(self.index.lookup("kitchen"), "light.kitchen")
+        self.assertGreater(self.index.next_sync_at - time.monotonic(), 290)
+        self.index.ensure_fresh(self.TOKEN)
+        self.assertFalse(self.index.syncing)
+
+    def test_failed_sync_is_retried_later_not_on_every_request(self):
+        self.patch(lf, "home_assistant_url", "http://127.0.0.1:9")
+        self.index.sync(self.TOKEN)
+        self.assertIsNone(self.index.lookup("kitchen"))
+        self.assertAlmostEqual(self.index.next_sync_at - time.monotonic(), lf.EntityIndex.RETRY_INTERVAL, delta=1)
+
+        # The next requests do not start another sync
+        self.index.ensure_fresh(self.TOKEN)
+        self.assertFalse(self.index.syncing)
+
+    def test_names_are_kept_when_a_sync_fails(self):
+        self.index.sync(self.TOKEN)
+        self.patch(lf, "home_assistant_url", "http://127.0.0.1:9")
+        self.index.sync(self.TOKEN)
+        self.assertEqual(self.index.lookup("kitchen"), "light.kitchen")
+
+if __name__ == "__main__":
+    unittest.main()
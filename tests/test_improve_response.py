@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Post-processing of the spoken answers (improve_response)
+import unittest
+
+from support import lf
+
+class ImproveResponseTest(unittest.TestCase):
+    def test_decimal_comma_follows_the_language_file(self):
+        for name in ("de-DE", "fr-FR", "it-IT", "es-ES", "pt-BR", "pt-PT", "pl-PL", "ru-RU", "sk-SK", "nl-NL"):
+            locale = lf.load_locale(name)
+            self.assertTrue(locale.decimal_comma, name)
+            self.assertEqual(lf.improve_response("21.5 °C, 0.25 kWh", locale), "21,5 °C, 0,25 kWh", name)
+
+        for name in ("en-US", "en-GB", "en-CA", "es-MX"):
+            locale = lf.load_locale(name)
+            self.assertFalse(locale.decimal_comma, name)
+            self.assertEqual(lf.improve_response("21.5 °C", locale), "21.5 °C", name)
+
+    def test_markup_and_line_breaks(self):
+        locale = lf.load_locale("en-US")
+        speech = "Summary:\n\n- **Kitchen**: on\n- car_charger: 80 %\n\nAnything else?"
+        self.assertEqual(lf.improve_response(speech, locale), "Summary Kitchen on, car charger 80 . Anything else?")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Spans of the Home Assistant calls in the metrics of one invocation (enable_metrics)
+import time
+import threading
+import contextvars
+import unittest
+
+from support import lf, HomeAssistantTestCase
+
+class HomeAssistantCallSpansTest(HomeAssistantTestCase):
+    FAKE_HA = {"latency": 0.4}
+
+    def setUp(self):
+        super().setUp()
+        self.record = lf.InvocationMetrics(cold_start=False)
+
+    def run_in_invocation(self, func):
+        token = lf.current_metrics.set(self.record)
+        try:
+            return threading.Thread(target=contextvars.copy_context().run, args=(func,))
+        finally:
+            lf.current_metrics.reset(token)
+
+    def test_parallel_connect_is_not_subtracted_from_ttfb(self):
+        # The connection of the measured call is already open
+        lf.ha_request("GET", "/api/states", self.TOKEN)
+
+        def parallel_connect():
+            # Another call of the same invocation opening a slow connection meanwhile
+            time.sleep(0.05)
+            with lf.profile_ha_connect():
+                time.sleep(0.3)
+
+        call = self.run_in_invocation(lambda: lf.ha_request("POST", "/api/conversation/process", self.TOKEN, json_data={"text": "hello"}))
+        connect = self.run_in_invocation(parallel_connect)
+        call.start()
+        connect.start()
+        call.join(5)
+        connect.join(5)
+
+        self.assertGreaterEqual(self.record.spans["ha_connect"], 300)
+        # About the 0.4 s latency of Home Assistant, not 0.4 s minus the 0.3 s connect
+        self.assertGreater(self.record.spans["ha_ttfb"], 350)
+
+if __name__ == "__main__":
+    unittest.main()
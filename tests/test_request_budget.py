@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Request budget (request_deadline): the Home Assistant call ends at the deadline
+import time
+import types
+import unittest
+
+from support import lf, HomeAssistantTestCase, alexa_envelope, LambdaContext
+
+class RequestBudgetTest(HomeAssistantTestCase):
+    # Home Assistant answers after the deadline
+    FAKE_HA = {"latency": 2}
+
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "request_deadline", 1)
+        self.patch(lf, "deadline_margin", 0)
+        self.patch(lf, "enable_acknowledgment_sound", "false")
+        self.patch(lf, "acknowledgment_delay", 0)
+        self.patch(lf, "request_coalescer", lf.RequestCoalescer(10, 8))
+
+    def budget(self):
+        return lf.RequestBudget(types.SimpleNamespace(context=None))
+
+    def ask(self):
+        envelope = alexa_envelope("GptQueryIntent", "en-US", query="what is the temperature")
+        return lf.lambda_handler(envelope, LambdaContext())["response"]["outputSpeech"]["ssml"]
+
+    def test_rest_call_ends_at_the_deadline(self):
+        start = time.monotonic()
+        speech = lf.process_conversation("what is the temperature", self.locale, self.new_state(), budget=self.budget())
+        # Without the budget, the call would wait for the answer (2 s) or home_assistant_read_timeout
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(speech, self.locale.get("alexa_speak_timeout"))
+
+    def test_websocket_call_ends_at_the_deadline(self):
+        self.patch(lf, "ha_websocket_enabled", True)
+        start = time.monotonic()
+        speech = lf.process_conversation("what is the temperature", self.locale, self.new_state(), budget=self.budget())
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(speech, self.locale.get("alexa_speak_timeout"))
+        self.assertEqual(self.server.requests["WS conversation/process"], 1)
+
+    def test_streamed_answer_is_cut_at_the_deadline(self):
+        self.patch(lf, "enable_streaming_response", "true")
+        self.server.options.update(latency=0, stream="sse", chunk_delay=0.2)
+        start = time.monotonic()
+        speech = lf.process_conversation("what is the temperature", self.locale, self.new_state(), on_first_sentence=lambda sentence: False, budget=self.budget())
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(speech, self.locale.get("alexa_speak_timeout"))
+
+    def test_retry_after_the_timeout_asks_again(self):
+        timed_out = lf.budget_stats["timed_out"]
+        self.assertIn(self.locale.get("alexa_speak_timeout"), self.ask())
+        self.assertEqual(lf.budget_stats["timed_out"], timed_out + 1)
+
+        # The user asks again once the timeout answer was spoken
+        time.sleep(0.2)
+        self.server.options["latency"] = 0
+        self.assertIn("living room", self.ask())
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+        stats = lf.request_coalescer.stats()
+        self.assertEqual((stats["coalesced"], stats["replayed"]), (0, 0))
+
+    def test_stages_are_emitted_as_metrics(self):
+        record = lf.InvocationMetrics(cold_start=False)
+        token = lf.current_metrics.set(record)
+        self.addCleanup(lf.current_metrics.reset, token)
+        lf.record_budget_stage("acknowledged")
+        lf.record_budget_stage("timed_out")
+        self.assertEqual(record.counts, {"BudgetAcknowledged": 1, "BudgetTimedOut": 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Coalescing of identical concurrent conversation requests (request_coalescing_window)
+import threading
+import unittest
+
+from support import lf, HomeAssistantTestCase
+
+class RequestCoalescingTest(HomeAssistantTestCase):
+    FAKE_HA = {"latency": 0.3}
+
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "request_coalescer", lf.RequestCoalescer(1, 8))
+
+    def ask_concurrently(self, states):
+        answers = {}
+        threads = [threading.Thread(target=lambda s=s: answers.setdefault(s.key, lf.process_conversation("Turn on the light.", self.locale, s))) for s in states]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return answers
+
+    def test_identical_requests_share_one_call_and_conversation(self):
+        kitchen, living_room = self.new_state("kitchen echo"), self.new_state("living room echo")
+        answers = self.ask_concurrently([kitchen, living_room])
+
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 1)
+        self.assertEqual(answers["kitchen echo"], answers["living room echo"])
+        self.assertEqual(lf.request_coalescer.stats()["coalesced"], 1)
+        self.assertEqual(kitchen.conversation_id, "fake-conversation")
+        self.assertEqual(living_room.conversation_id, "fake-conversation")
+        self.assertEqual(lf.session_store.get("living room echo").conversation_id, "fake-conversation")
+
+    def test_other_account_is_not_shared(self):
+        other = self.new_state("other")
+        other.account_linking_token = "another-token"
+        self.ask_concurrently([self.new_state(), other])
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Response cache of the conversation answers (response_cache_ttl)
+import unittest
+
+from support import lf, HomeAssistantTestCase
+
+class ResponseCacheTest(HomeAssistantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "response_cache", lf.ResponseCache(60, 8))
+        self.record = lf.InvocationMetrics(cold_start=False)
+        token = lf.current_metrics.set(self.record)
+        self.addCleanup(lf.current_metrics.reset, token)
+
+    def ask(self, state, query="what is the temperature", device_id=None):
+        return lf.process_conversation(query, self.locale, state, device_id)
+
+    def test_answer_is_reused_when_the_conversation_changes(self):
+        state = self.new_state()
+        first = self.ask(state)
+        # Home Assistant gave the session a conversation_id, the same question still hits
+        self.assertEqual(state.conversation_id, "fake-conversation")
+        self.assertEqual(self.ask(state), first)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 1)
+        self.assertEqual(self.record.counts, {"ResponseCacheMisses": 1, "ResponseCacheHits": 1})
+        self.assertEqual(lf.response_cache.stats()["hits"], 1)
+
+    def test_answer_is_not_shared_with_another_account(self):
+        self.ask(self.new_state())
+        other_user = lf.SessionState("another session")
+        other_user.account_linking_token = "another-token"
+        self.ask(other_user)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+        self.assertEqual(self.record.counts, {"ResponseCacheMisses": 2})
+
+    def test_answer_is_not_shared_with_another_device(self):
+        self.ask(self.new_state(), device_id="kitchen-echo")
+        self.ask(self.new_state("another session"), device_id="bedroom-echo")
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+
+    def test_follow_up_is_never_cached(self):
+        state = self.new_state()
+        self.ask(state, "and the kitchen?")
+        self.ask(state, "And the kitchen")
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+        self.assertEqual(self.record.counts, {})
+        self.assertEqual(lf.response_cache.stats()["size"], 0)
+
+    def test_counts_are_emitted_as_metrics(self):
+        self.ask(self.new_state())
+        emf = self.record.to_emf()
+        self.assertEqual(emf["ResponseCacheMisses"], 1)
+        self.assertIn({"Name": "ResponseCacheMisses", "Unit": "Count"}, emf["_aws"]["CloudWatchMetrics"][0]["Metrics"])
+
+if __name__ == "__main__":
+    unittest.main()
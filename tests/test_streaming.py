@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Streamed conversation answers (enable_streaming_response), against the stub of fake_ha.py
+import json
+import time
+import threading
+import unittest
+
+from support import lf, HomeAssistantTestCase, alexa_envelope, LambdaContext
+
+FIRST_SENTENCE = "The living room is at 21.5 degrees and all the lights are off."
+REST_OF_ANSWER = "The washing machine will finish in 25 minutes. Tomorrow will be sunny, with a high of 24 degrees."
+
+RESULT = {"conversation_id": "c1", "response": {"response_type": "query_answer", "speech": {"plain": {"speech": "Done"}}}}
+
+class ParseStreamEventTest(unittest.TestCase):
+    def test_sse_lines(self):
+        delta = {"type": "intent-progress", "data": {"chat_log_delta": {"content": "Hello "}}}
+        self.assertEqual(lf.parse_stream_event(f"data: {json.dumps(delta)}"), ("Hello ", None))
+        end = {"type": "intent-end", "data": {"intent_output": RESULT}}
+        self.assertEqual(lf.parse_stream_event(f"data: {json.dumps(end)}\n"), (None, RESULT))
+
+    def test_ndjson_lines(self):
+        self.assertEqual(lf.parse_stream_event(json.dumps({"delta": "Hel"})), ("Hel", None))
+        self.assertEqual(lf.parse_stream_event(json.dumps({"content": "lo"})), ("lo", None))
+        self.assertEqual(lf.parse_stream_event(json.dumps(RESULT)), (None, RESULT))
+
+    def test_lines_without_content(self):
+        for line in ("", "   ", ": keep-alive", "event: message", "data: [DONE]", "data: {not json"):
+            self.assertEqual(lf.parse_stream_event(line), (None, None), line)
+
+class StreamConversationTest(HomeAssistantTestCase):
+    FAKE_HA = {"stream": "sse", "chunk_delay": 0.05}
+
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "enable_streaming_response", "true")
+        self.spoken = []
+
+    def on_first_sentence(self, sentence):
+        self.spoken.append(sentence)
+        return True
+
+    def stream(self):
+        data = {"text": f"summary {time.monotonic()}"}
+        return lf.stream_conversation(data, self.TOKEN, self.locale, self.on_first_sentence)
+
+    def test_sse_answer(self):
+        _, result, spoken = self.stream()
+        self.assertEqual(result["response"]["speech"]["plain"]["speech"], self.server.options["answer"])
+        self.assertEqual(spoken, FIRST_SENTENCE)
+        self.assertEqual(self.spoken, [FIRST_SENTENCE])
+
+    def test_ndjson_answer(self):
+        self.server.options["stream"] = "ndjson"
+        _, result, spoken = self.stream()
+        self.assertEqual(result["conversation_id"], "fake-conversation")
+        self.assertEqual(spoken, FIRST_SENTENCE)
+        self.assertEqual(self.spoken, [FIRST_SENTENCE])
+
+    def test_json_answer_is_not_streamed(self):
+        self.server.options["stream"] = None
+        response, result, spoken = self.stream()
+        self.assertIsNone(result)
+        self.assertEqual(spoken, "")
+        self.assertEqual(self.spoken, [])
+        self.assertEqual(response.json()["response"]["speech"]["plain"]["speech"], self.server.options["answer"])
+
+        speech = lf.process_conversation("what is new", self.locale, self.new_state(), None, self.on_first_sentence)
+        self.assertEqual(speech, f"{FIRST_SENTENCE} {REST_OF_ANSWER}")
+        self.assertEqual(self.spoken, [])
+
+    def test_unspoken_sentence_stays_in_the_answer(self):
+        speech = lf.process_conversation("what is new", self.locale, self.new_state(), None, lambda sentence: False)
+        self.assertEqual(speech, f"{FIRST_SENTENCE} {REST_OF_ANSWER}")
+
+    def test_speaking_does_not_stall_the_stream(self):
+        reader = threading.get_ident()
+        speakers = []
+
+        def slow_first_sentence(sentence):
+            # About as slow as the progressive response call to Alexa can be
+            speakers.append(threading.get_ident())
+            time.sleep(0.5)
+            return True
+
+        self.server.options["chunk_delay"] = 0.1
+        start = time.monotonic()
+        _, result, spoken = lf.stream_conversation({"text": "summary"}, self.TOKEN, self.locale, slow_first_sentence)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(spoken, FIRST_SENTENCE)
+        self.assertNotEqual(speakers, [reader])
+        # The 9 chunks take 0.8 s, the first sentence is complete after 0.3 s: reading the stream
+        # while speaking takes 0.8 s, speaking inside the read loop would take 1.3 s
+        self.assertLess(elapsed, 1.1)
+
+class GptQueryStreamingTest(HomeAssistantTestCase):
+    FAKE_HA = {"stream": "sse", "chunk_delay": 0.05}
+
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "enable_streaming_response", "true")
+        self.patch(lf, "enable_acknowledgment_sound", "false")
+        self.patch(lf, "acknowledgment_delay", 0)
+        self.progressive = []
+        self.patch(lf, "send_progressive_response", lambda handler_input, request, speech: self.progressive.append(speech) or True)
+
+    def test_first_sentence_is_spoken_once_and_not_repeated(self):
+        envelope = alexa_envelope("GptQueryIntent", "en-US", query="give me a summary of the house")
+        response = lf.lambda_handler(envelope, LambdaContext())
+
+        self.assertEqual(self.progressive, [FIRST_SENTENCE])
+        ssml = response["response"]["outputSpeech"]["ssml"]
+        self.assertNotIn(FIRST_SENTENCE, ssml)
+        self.assertIn(REST_OF_ANSWER, ssml)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
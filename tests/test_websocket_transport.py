@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Websocket transport to Home Assistant (home_assistant_transport = websocket), against the stub of fake_ha.py
+import time
+import threading
+import unittest
+
+from support import lf, HomeAssistantTestCase, set_state, drop_websockets
+
+try:
+    import websocket  # noqa: F401
+except ImportError:
+    websocket = None
+
+ANSWER_START = "The living room is at 21.5 degrees"
+
+@unittest.skipIf(websocket is None, "websocket-client is not installed")
+class WebSocketTransportTest(HomeAssistantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(lf, "ha_websocket_enabled", True)
+
+    def ask(self, query="what is the temperature", state=None):
+        return lf.process_conversation(query, self.locale, state or self.new_state())
+
+    def test_conversation_goes_over_the_websocket(self):
+        state = self.new_state()
+        self.assertTrue(self.ask(state=state).startswith(ANSWER_START))
+        self.assertEqual(state.conversation_id, "fake-conversation")
+        self.assertEqual(self.server.requests["WS conversation/process"], 1)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 0)
+
+    def test_falls_back_to_rest_without_websocket_endpoint(self):
+        self.server.options["websocket"] = False
+        self.assertTrue(self.ask().startswith(ANSWER_START))
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 1)
+        self.assertEqual(self.server.requests["WS conversation/process"], 0)
+
+    def test_falls_back_to_rest_when_authentication_is_rejected(self):
+        self.server.options["access_token"] = "another-token"
+        self.assertTrue(self.ask().startswith(ANSWER_START))
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 1)
+        self.assertTrue(lf.ha_websockets[self.TOKEN].closed)
+
+    def test_failed_connection_is_not_retried_on_every_request(self):
+        self.server.options["websocket"] = False
+        self.ask("first question")
+        self.ask("second question")
+        self.assertEqual(self.server.requests["GET /api/websocket"], 1)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 2)
+
+    def test_reconnects_after_the_server_closes_the_socket(self):
+        self.ask("first question")
+        drop_websockets(self.server)
+        self.wait_until(lambda: lf.ha_websockets[self.TOKEN].closed)
+
+        self.assertTrue(self.ask("second question").startswith(ANSWER_START))
+        self.assertEqual(self.server.requests["GET /api/websocket"], 2)
+        self.assertEqual(self.server.requests["WS conversation/process"], 2)
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 0)
+
+    def test_stale_connection_is_pinged_before_use(self):
+        self.ask("first question")
+        lf.ha_websockets[self.TOKEN].last_received -= lf.HomeAssistantWebSocket.IDLE_CHECK + 1
+        self.ask("second question")
+        self.assertEqual(self.server.requests["WS ping"], 1)
+        self.assertEqual(self.server.requests["GET /api/websocket"], 1)
+
+    def test_prompt_is_served_from_the_subscription(self):
+        self.assertEqual(lf.read_prompt_state(self.TOKEN), "")
+        set_state(self.server, lf.assist_input_entity, "Good morning, open the blinds?")
+        # No wait: the read must see the change already pushed on the socket
+        self.assertEqual(lf.read_prompt_state(self.TOKEN), "Good morning, open the blinds?")
+        set_state(self.server, lf.assist_input_entity, "Second prompt")
+        self.assertEqual(lf.read_prompt_state(self.TOKEN), "Second prompt")
+
+        self.assertEqual(self.server.requests["WS subscribe_entities"], 1)
+        self.assertEqual(self.server.requests[f"GET /api/states/{lf.assist_input_entity}"], 0)
+
+    def test_prompt_falls_back_to_rest(self):
+        self.server.options["websocket"] = False
+        self.server.states[lf.assist_input_entity] = "From REST"
+        self.assertEqual(lf.read_prompt_state(self.TOKEN), "From REST")
+        self.assertEqual(self.server.requests[f"GET /api/states/{lf.assist_input_entity}"], 1)
+
+    def test_entity_index_uses_get_states(self):
+        index = lf.EntityIndex(300)
+        index.sync(self.TOKEN)
+        self.assertEqual(index.lookup("kitchen"), "light.kitchen")
+        self.assertEqual(self.server.requests["WS get_states"], 1)
+        self.assertEqual(self.server.requests["GET /api/states"], 0)
+
+    def test_in_flight_requests_fail_when_the_socket_drops(self):
+        self.ask("warm up")
+        self.server.options["latency"] = 2
+        answers = []
+        threads = [threading.Thread(target=lambda q=q: answers.append(self.ask(q))) for q in ("turn on the light", "close the garage")]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        self.wait_until(lambda: self.server.requests["WS conversation/process"] == 3)
+        drop_websockets(self.server)
+        for thread in threads:
+            thread.join(5)
+
+        # Both callers get the error answer at once, instead of waiting for the read timeout
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(answers, [self.locale.get("alexa_speak_error")] * 2)
+        # A command already sent may have been executed, it is not sent again over REST
+        self.assertEqual(self.server.requests["POST /api/conversation/process"], 0)
+        self.assertEqual(lf.ha_websockets[self.TOKEN].pending, {})
+
+        self.server.options["latency"] = 0
+        self.assertTrue(self.ask("after the drop").startswith(ANSWER_START))
+        self.assertEqual(self.server.requests["GET /api/websocket"], 2)
+
+    def test_error_result_is_spoken(self):
+        self.server.options["error_rate"] = 1
+        self.assertEqual(self.ask(), lf.improve_response(f"{self.locale.get('alexa_speak_error')} Simulated error", self.locale))
+
+    def wait_until(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Condition not met in time")
+            time.sleep(0.01)
+
+if __name__ == "__main__":
+    unittest.main()